@@ -0,0 +1,200 @@
+"""Archival of closed cases to cold collections.
+
+Cases that have been closed (removed or denied) for longer than
+ARCHIVE_AFTER_DAYS move, with their targets, from cases/targets to
+cases_archive/targets_archive, so the live collections and their indexes only
+hold cases that still change. The API reads archived cases from the archive
+collections when the live lookup misses. Run standalone with
+`python archiver.py`, or in the API process by setting ARCHIVE_ENABLED=1.
+
+Cases are claimed with a lease like checker targets. A case is copied before
+it is deleted, and only deleted if its version has not moved since it was
+claimed; otherwise the copy is dropped and the case is tried again on a
+later run. Targets written after the copy are caught when the live targets
+are purged. Every step is idempotent, so a run interrupted anywhere is
+completed by the next one.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+from pymongo import DeleteOne, ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+CLOSED_STATUSES = ["removed", "denied"]
+# Claim bookkeeping, not copied to the archive
+LEASE_FIELDS = ("archive_owner", "archive_until")
+
+
+class CaseArchiver:
+    def __init__(
+        self,
+        db,
+        archive_after: float = 90 * 24 * 60 * 60,
+        batch_size: int = 100,
+        target_batch: int = 1000,
+        lease: float = 600
+    ):
+        self.db = db
+        self.archive_after = archive_after
+        self.batch_size = batch_size
+        self.target_batch = target_batch
+        self.lease = lease
+
+    async def claim(self) -> Optional[dict]:
+        """Lease one closed case that is old enough to archive"""
+        now = datetime.now(timezone.utc)
+        lease = {"archive_owner": str(uuid.uuid4()), "archive_until": now + timedelta(seconds=self.lease)}
+        case = await self.db.cases.find_one_and_update(
+            {
+                "status": {"$in": CLOSED_STATUSES},
+                "updated_at": {"$lt": now - timedelta(seconds=self.archive_after)},
+                "$or": [{"archive_until": {"$exists": False}}, {"archive_until": {"$lt": now}}],
+            },
+            {"$set": lease},
+            sort=[("updated_at", 1)]
+        )
+        if case:
+            case.update(lease)
+        return case
+
+    async def _copy_targets(self, targets: List[dict]):
+        await self.db.targets_archive.bulk_write(
+            [ReplaceOne({"_id": target["_id"]}, target, upsert=True) for target in targets], ordered=False
+        )
+
+    async def archive_case(self, case: dict) -> Optional[int]:
+        """Move a claimed case and its targets; returns the targets moved, or None if the case changed"""
+        case_id = case["id"]
+        owner = case["archive_owner"]
+
+        moved = 0
+        batch = []
+        async for target in self.db.targets.find({"case_id": case_id}).batch_size(self.target_batch):
+            batch.append(target)
+            if len(batch) == self.target_batch:
+                await self._copy_targets(batch)
+                moved += len(batch)
+                batch = []
+        if batch:
+            await self._copy_targets(batch)
+            moved += len(batch)
+
+        archived = {key: value for key, value in case.items() if key not in LEASE_FIELDS}
+        archived["archived_at"] = datetime.now(timezone.utc)
+        archived["targets_purged"] = False
+        await self.db.cases_archive.replace_one({"_id": case["_id"]}, archived, upsert=True)
+
+        # Any write to the case or its targets bumps version, so a match
+        # means the copy is complete and current
+        result = await self.db.cases.delete_one(
+            {"_id": case["_id"], "archive_owner": owner, "version": case.get("version")}
+        )
+        if not result.deleted_count:
+            live = await self.db.cases.find_one({"_id": case["_id"]}, {"archive_owner": 1})
+            # Changed while copying: drop the copy and leave the lease to
+            # lapse, so the case is retried on a later run
+            if live is not None and live.get("archive_owner") == owner:
+                await self.db.cases_archive.delete_one({"_id": case["_id"]})
+                await self.db.targets_archive.delete_many({"case_id": case_id})
+            return None
+
+        await self.purge_targets(case_id)
+        return moved
+
+    async def purge_targets(self, case_id: str):
+        """Drop the live targets of an archived case, archiving any the copy missed.
+
+        A write that checked the case just before it was deleted can still add
+        or change a target after the copy, and its version bump comes too late
+        to be caught. So live targets that differ from their archived copy are
+        copied again, and each is deleted only if it still matches what was
+        copied, until none are left.
+        """
+        while True:
+            batch = await self.db.targets.find({"case_id": case_id}).to_list(self.target_batch)
+            if not batch:
+                break
+            archived = {
+                target["_id"]: target
+                async for target in self.db.targets_archive.find({"_id": {"$in": [t["_id"] for t in batch]}})
+            }
+            stale = [target for target in batch if archived.get(target["_id"]) != target]
+            if stale:
+                await self._copy_targets(stale)
+            await self.db.targets.bulk_write([DeleteOne(target) for target in batch], ordered=False)
+        await self.db.cases_archive.update_one({"id": case_id}, {"$set": {"targets_purged": True}})
+
+    async def purge_interrupted(self) -> int:
+        """Finish archives whose live targets were not yet deleted"""
+        purged = 0
+        async for case in self.db.cases_archive.find({"targets_purged": False}, {"_id": 0, "id": 1}):
+            # Still live: being archived right now, or about to be rolled back
+            if await self.db.cases.find_one({"id": case["id"]}, {"_id": 1}) is None:
+                await self.purge_targets(case["id"])
+                purged += 1
+        return purged
+
+    async def run_once(self) -> dict:
+        """Archive up to batch_size cases"""
+        cases = targets = 0
+        await self.purge_interrupted()
+        for _ in range(self.batch_size):
+            case = await self.claim()
+            if case is None:
+                break
+            moved = await self.archive_case(case)
+            if moved is not None:
+                cases += 1
+                targets += moved
+        if cases:
+            logger.info(f"Archived {cases} cases with {targets} targets")
+        return {"cases": cases, "targets": targets}
+
+    async def run_forever(self, interval: float = 3600):
+        """Archive batches back to back, sleeping `interval` seconds when idle"""
+        while True:
+            try:
+                archived = (await self.run_once())["cases"]
+            except Exception as e:
+                logger.error(f"Archive run failed: {e!r}")
+                archived = 0
+            if archived < self.batch_size:
+                await asyncio.sleep(interval)
+
+
+def archiver_from_env(db) -> CaseArchiver:
+    return CaseArchiver(
+        db,
+        archive_after=float(os.environ.get('ARCHIVE_AFTER_DAYS', 90)) * 24 * 60 * 60,
+        batch_size=int(os.environ.get('ARCHIVE_BATCH_SIZE', 100)),
+        target_batch=int(os.environ.get('ARCHIVE_TARGET_BATCH', 1000)),
+        lease=float(os.environ.get('ARCHIVE_LEASE', 600))
+    )
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    archiver = archiver_from_env(client[os.environ['DB_NAME']])
+    try:
+        await archiver.run_forever(float(os.environ.get('ARCHIVE_INTERVAL', 3600)))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(main())
@@ -0,0 +1,376 @@
+"""Background liveness checker for takedown targets.
+
+Re-checks pending/filed targets over HTTP and marks them removed once the
+host answers 404 or 410. Run standalone with `python checker.py`, or in the
+API process by setting CHECKER_ENABLED=1.
+
+Each target carries an indexed next_check_at. Workers claim due targets in
+small batches by pushing next_check_at forward by a lease, so any number of
+worker processes can share the queue; a crashed worker's targets come due
+again when the lease runs out.
+
+Target URLs come from clients, so requests only go to globally routable
+addresses: a URL or redirect pointing at loopback, private, link-local
+(cloud metadata) or other reserved ranges fails like an unreachable host.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+
+from rollups import DomainRollups, RollupDelta
+
+logger = logging.getLogger(__name__)
+
+CHECKABLE_STATUSES = ["pending", "filed"]
+REMOVED_STATUS_CODES = {404, 410}
+# Hosts that reject HEAD get a streamed GET instead
+HEAD_UNSUPPORTED_STATUS_CODES = {405, 501}
+
+# Base re-check interval by case priority, in seconds
+PRIORITY_INTERVALS = {
+    "urgent": 15 * 60,
+    "high": 60 * 60,
+    "normal": 6 * 60 * 60,
+}
+# Filed targets are expected to come down soon; pending ones can wait longer
+STATUS_FACTORS = {"filed": 1, "pending": 2}
+MAX_BACKOFF_DOUBLINGS = 5
+MAX_INTERVAL = 7 * 24 * 60 * 60
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def is_public_address(address: str) -> bool:
+    """Whether an IP address is globally routable"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class PublicAddressTransport(httpx.AsyncBaseTransport):
+    """Transport that resolves each request's host and only connects to public addresses.
+
+    The request is sent to the address that was checked, with the original
+    Host header and TLS server name, so DNS can't hand out an internal
+    address between the check and the connection. The client calls the
+    transport once per redirect hop, so every hop is checked.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def resolve(self, request: httpx.Request) -> str:
+        host = request.url.host
+        port = request.url.port or DEFAULT_PORTS.get(request.url.scheme, 80)
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            raise httpx.ConnectError(f"Could not resolve {host}: {e}", request=request)
+        addresses = [info[4][0] for info in infos]
+        # One internal address is enough to refuse: the connect could pick it
+        if not addresses or not all(is_public_address(address) for address in addresses):
+            raise httpx.ConnectError(f"{host} does not resolve to a public address", request=request)
+        return addresses[0]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        address = await self.resolve(request)
+        pinned = httpx.Request(
+            request.method,
+            request.url.copy_with(host=address),
+            headers=request.headers,
+            stream=request.stream,
+            extensions={**request.extensions, "sni_hostname": request.url.host},
+        )
+        return await self._transport.handle_async_request(pinned)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def next_check_delay(priority: str, status: str, unchanged_checks: int) -> timedelta:
+    """Delay before the next check, doubling for each check that saw no change"""
+    base = PRIORITY_INTERVALS.get(priority, PRIORITY_INTERVALS["normal"])
+    delay = base * STATUS_FACTORS.get(status, 1) * 2 ** min(unchanged_checks, MAX_BACKOFF_DOUBLINGS)
+    return timedelta(seconds=min(delay, MAX_INTERVAL))
+
+
+class TargetChecker:
+    """Checks targets concurrently, bounded globally and per domain"""
+
+    def __init__(
+        self,
+        db,
+        client: Optional[httpx.AsyncClient] = None,
+        concurrency: int = 50,
+        per_domain: int = 2,
+        timeout: float = 10,
+        batch_size: int = 100,
+        lease: float = 300,
+        allow_private_addresses: bool = False
+    ):
+        self.db = db
+        self.rollups = DomainRollups(db.domain_stats)
+        self.batch_size = batch_size
+        self.lease = lease
+        self.per_domain = per_domain
+        self._owns_client = client is None
+        if client is None:
+            transport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            )
+            client = httpx.AsyncClient(
+                transport=transport if allow_private_addresses else PublicAddressTransport(transport),
+                timeout=timeout,
+                follow_redirects=True,
+                headers={"User-Agent": "ContentGuard-Checker/1.0"}
+            )
+        self.client = client
+        self._global = asyncio.Semaphore(concurrency)
+        self._domains = {}  # domain -> [semaphore, users]
+
+    @asynccontextmanager
+    async def _domain_slot(self, domain: str):
+        """Hold one of the domain's slots, dropping its semaphore once unused"""
+        entry = self._domains.setdefault(domain, [asyncio.Semaphore(self.per_domain), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._domains[domain]
+
+    async def fetch_status(self, url: str) -> Optional[int]:
+        """HTTP status for url, or None if the request failed or timed out"""
+        try:
+            response = await self.client.head(url)
+            if response.status_code in HEAD_UNSUPPORTED_STATUS_CODES:
+                async with self.client.stream("GET", url) as response:
+                    pass
+            return response.status_code
+        except httpx.HTTPError as e:
+            logger.info(f"Check failed for {url}: {e!r}")
+            return None
+
+    async def check_target(self, target: dict, priority: str) -> Optional[int]:
+        """Check and reschedule one leased target.
+
+        Returns the HTTP status, or None if the request failed or the lease
+        was lost to another worker before the result was written.
+        """
+        async with self._domain_slot(target.get("domain") or ""):
+            async with self._global:
+                status_code = await self.fetch_status(target["url"])
+
+        now = datetime.now(timezone.utc)
+        unchanged_checks = target.get("unchanged_checks", 0)
+        unchanged_checks = unchanged_checks + 1 if status_code == target.get("last_status_code") else 0
+        update = {
+            "last_checked_at": now,
+            "last_status_code": status_code,
+            "unchanged_checks": unchanged_checks,
+        }
+        if status_code in REMOVED_STATUS_CODES:
+            update["status"] = "removed"
+            update["removed_at"] = now
+            update["next_check_at"] = None
+        else:
+            update["next_check_at"] = now + next_check_delay(priority, target["status"], unchanged_checks)
+
+        result = await self.db.targets.update_one(
+            {"id": target["id"], "lease_owner": target["lease_owner"]},
+            {"$set": update, "$unset": {"lease_owner": ""}}
+        )
+        return status_code if result.matched_count else None
+
+    async def _lease(self, claimable: dict, candidates: List[dict]) -> List[dict]:
+        """Lease the candidates still matching `claimable` to a new owner and return them.
+
+        Re-checking `claimable` in the update means each target is claimed by
+        exactly one worker even when several picked the same candidates.
+        """
+        lease_owner = str(uuid.uuid4())
+        await self.db.targets.update_many(
+            {**claimable, "id": {"$in": [c["id"] for c in candidates]}},
+            {"$set": {
+                "next_check_at": datetime.now(timezone.utc) + timedelta(seconds=self.lease),
+                "lease_owner": lease_owner,
+            }}
+        )
+        return await self.db.targets.find(
+            {"lease_owner": lease_owner},
+            {"_id": 0, "id": 1, "case_id": 1, "url": 1, "domain": 1, "status": 1,
+             "last_status_code": 1, "unchanged_checks": 1, "lease_owner": 1, "created_at": 1}
+        ).to_list(None)
+
+    async def claim_batch(self) -> List[dict]:
+        """Lease up to batch_size due targets to this worker"""
+        now = datetime.now(timezone.utc)
+        due = {"status": {"$in": CHECKABLE_STATUSES}, "next_check_at": {"$lte": now}}
+        candidates = await self.db.targets.find(due, {"_id": 0, "id": 1}).sort(
+            "next_check_at", 1
+        ).to_list(self.batch_size)
+        if not candidates:
+            return []
+        return await self._lease(due, candidates)
+
+    async def claim_case_batch(self, case_id: str, since: datetime) -> List[dict]:
+        """Lease up to batch_size of a case's checkable targets not checked since `since`.
+
+        Due or not, except that targets under another worker's unexpired
+        lease are left to it.
+        """
+        now = datetime.now(timezone.utc)
+        claimable = {
+            "case_id": case_id,
+            "status": {"$in": CHECKABLE_STATUSES},
+            "last_checked_at": {"$not": {"$gte": since}},
+            "$or": [{"lease_owner": {"$exists": False}}, {"next_check_at": {"$lte": now}}],
+        }
+        candidates = await self.db.targets.find(claimable, {"_id": 0, "id": 1}).limit(
+            self.batch_size
+        ).to_list(None)
+        if not candidates:
+            return []
+        return await self._lease(claimable, candidates)
+
+    async def load_cases(self, targets: List[dict]) -> dict:
+        """Priority and client of each target's case, by case id"""
+        case_ids = list({target["case_id"] for target in targets})
+        cases = await self.db.cases.find(
+            {"id": {"$in": case_ids}}, {"_id": 0, "id": 1, "priority": 1, "client_id": 1}
+        ).to_list(None)
+        return {case["id"]: case for case in cases}
+
+    async def _check_batch(self, targets: List[dict], cases: dict) -> int:
+        """Check targets concurrently, returning how many came back removed"""
+        results = await asyncio.gather(
+            *(
+                self.check_target(target, cases.get(target["case_id"], {}).get("priority", "normal"))
+                for target in targets
+            ),
+            return_exceptions=True
+        )
+
+        now = datetime.now(timezone.utc)
+        removed = 0
+        deltas = {}  # client id -> domain rollup changes
+        for target, result in zip(targets, results):
+            if isinstance(result, Exception):
+                logger.error(f"Checking target {target['id']} failed: {result!r}")
+            elif result in REMOVED_STATUS_CODES:
+                removed += 1
+                client_id = cases.get(target["case_id"], {}).get("client_id")
+                deltas.setdefault(client_id, RollupDelta()).transition(
+                    target.get("domain") or "", target["status"], "removed", target.get("created_at"), now
+                )
+        for client_id, delta in deltas.items():
+            await self.rollups.apply(client_id, delta)
+        return removed
+
+    async def run_once(self) -> int:
+        """Claim and check one batch of due targets"""
+        targets = await self.claim_batch()
+        if not targets:
+            return 0
+        cases = await self.load_cases(targets)
+        await self._check_batch(targets, cases)
+
+        # Checked targets changed, so cached target lists of their cases are stale
+        await self.db.cases.update_many(
+            {"id": {"$in": list(cases)}}, {"$inc": {"version": 1}}
+        )
+        return len(targets)
+
+    async def check_case(self, case: dict, progress=None) -> dict:
+        """Check every checkable target of one case now, ignoring next_check_at.
+
+        Targets are leased and checked batch_size at a time, like claimed
+        batches, so no lease has to outlast the whole case; ones the
+        background loop is checking meanwhile are left to it. `progress` is
+        awaited with (done, total) after each batch.
+        """
+        case_id = case["id"]
+        cases = {case_id: case}
+        started = datetime.now(timezone.utc)
+        total = await self.db.targets.count_documents({"case_id": case_id, "status": {"$in": CHECKABLE_STATUSES}})
+        checked = removed = 0
+        while True:
+            batch = await self.claim_case_batch(case_id, started)
+            if not batch:
+                break
+            removed += await self._check_batch(batch, cases)
+            checked += len(batch)
+            if progress:
+                await progress(checked, total)
+        return {"checked": checked, "removed": removed}
+
+    async def schedule_unscheduled(self) -> int:
+        """Make checkable targets written before next_check_at existed due now"""
+        result = await self.db.targets.update_many(
+            {"status": {"$in": CHECKABLE_STATUSES}, "next_check_at": {"$exists": False}},
+            {"$set": {"next_check_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count
+
+    async def run_forever(self, interval: float = 60):
+        """Check batches back to back, sleeping `interval` seconds when idle"""
+        await self.schedule_unscheduled()
+        while True:
+            try:
+                checked = await self.run_once()
+            except Exception as e:
+                logger.error(f"Checker batch failed: {e!r}")
+                checked = 0
+            if checked < self.batch_size:
+                await asyncio.sleep(interval)
+
+    async def close(self):
+        if self._owns_client:
+            await self.client.aclose()
+
+
+def checker_from_env(db) -> TargetChecker:
+    return TargetChecker(
+        db,
+        concurrency=int(os.environ.get('CHECKER_CONCURRENCY', 50)),
+        per_domain=int(os.environ.get('CHECKER_PER_DOMAIN', 2)),
+        timeout=float(os.environ.get('CHECKER_TIMEOUT', 10)),
+        batch_size=int(os.environ.get('CHECKER_BATCH_SIZE', 100)),
+        lease=float(os.environ.get('CHECKER_LEASE', 300))
+    )
+
+
+async def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    checker = checker_from_env(client[os.environ['DB_NAME']])
+    try:
+        await checker.run_forever(float(os.environ.get('CHECKER_INTERVAL', 60)))
+    finally:
+        await checker.close()
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""Response compression: brotli or gzip, negotiated from Accept-Encoding.
+
+Bodies sent whole are compressed in one go when they reach minimum_size, so
+small responses are not made larger. Streamed bodies (NDJSON lists and CSV
+exports) are compressed incrementally and sent as the compressor fills
+blocks, rather than as one small flushed block per row. Responses that
+already carry a Content-Encoding, are not text-like (gzip exports) or are
+event streams pass through untouched.
+
+Brotli is used when the optional `brotli` package is installed and the
+client accepts it; it compresses JSON noticeably better than gzip at a
+similar CPU cost on low quality settings.
+"""
+
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Long-lived, so each would hold a compressor's window for its whole lifetime
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def accepted_encodings(header: str) -> dict:
+    """Content-coding -> q value from an Accept-Encoding header"""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """The best encoding we support for an Accept-Encoding header, or None"""
+    accepted = accepted_encodings(header)
+    supported = ["br", "gzip"] if brotli else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        # Ties keep the earlier, denser coding
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.compress(data)
+        return output + self._compressor.flush() if final else output
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + self._compressor.finish() if final else output
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing text-like responses the client accepts compressed"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compressor(self, encoding: str):
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.gzip_level)
+
+    @staticmethod
+    def compressible(headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNCOMPRESSED_TYPES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start = None
+        compressor = None
+
+        async def send_wrapper(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                first, start = start, None
+                headers = MutableHeaders(scope=first)
+                if self.compressible(headers):
+                    # Weak ETags stay valid across encodings, so they are kept as is
+                    headers.add_vary_header("Accept-Encoding")
+                    if encoding and (more_body or len(body) >= self.minimum_size):
+                        compressor = self.compressor(encoding)
+                        headers["Content-Encoding"] = encoding
+                        if "content-length" in headers:
+                            del headers["Content-Length"]
+                        if not more_body:
+                            body = compressor.compress(body, final=True)
+                            headers["Content-Length"] = str(len(body))
+                            await send(first)
+                            await send({"type": "http.response.body", "body": body})
+                            return
+                await send(first)
+
+            if compressor is None:
+                await send(message)
+                return
+            body = compressor.compress(body, final=not more_body)
+            if body or not more_body:
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
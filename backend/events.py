@@ -0,0 +1,203 @@
+"""Per-case event fan-out for the Server-Sent Events endpoint.
+
+Events come from MongoDB change streams when the deployment supports them
+(replica sets and sharded clusters). Otherwise the write routes publish them
+to the in-process bus directly, which only reaches subscribers connected to
+the same worker.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Inserts and status changes only: lease claims, check timestamps and version
+# bumps never reach subscribers. No updateLookup; inserts carry the document
+# and updates their new status, and the owning case is resolved in batches.
+CHANGE_STREAM_PIPELINE = [
+    {"$match": {
+        "ns.coll": {"$in": ["cases", "targets"]},
+        "$or": [
+            {"operationType": "insert"},
+            {"operationType": "update", "updateDescription.updatedFields.status": {"$exists": True}},
+        ],
+    }},
+    {"$project": {
+        "ns.coll": 1,
+        "operationType": 1,
+        "documentKey": 1,
+        "fullDocument.id": 1,
+        "fullDocument.case_id": 1,
+        "fullDocument.status": 1,
+        "updateDescription.updatedFields.status": 1,
+    }},
+]
+# Changes already waiting are handled together, up to this many
+CHANGE_STREAM_BATCH = 1000
+CHANGE_STREAM_MAX_AWAIT_MS = 250
+CHANGE_STREAM_RETRY_DELAY = 30
+
+
+class Subscriber:
+    """One SSE connection: a bounded queue that collapses to a resync when full"""
+
+    def __init__(self, case_id: str, max_queue: int):
+        self.case_id = case_id
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.resync_pending = False
+
+    def offer(self, event: dict):
+        if self.resync_pending:
+            # The client refetches everything on resync anyway
+            return
+        if self.queue.full():
+            # A slow client gets one resync instead of unbounded buffering
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": "resync", "case_id": self.case_id}
+            self.resync_pending = True
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        event = await self.queue.get()
+        if event["type"] == "resync":
+            self.resync_pending = False
+        return event
+
+
+class EventBus:
+    """In-process pub/sub of case and target changes keyed by case id"""
+
+    def __init__(self, max_subscribers: int = 5000, max_queue: int = 100):
+        self.max_subscribers = max_subscribers
+        self.max_queue = max_queue
+        self.change_stream_active = False
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._count = 0
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    def subscribe(self, case_id: str) -> Optional[Subscriber]:
+        """Register a subscriber, or return None when at max_subscribers"""
+        if self._count >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(case_id, self.max_queue)
+        self._subscribers.setdefault(case_id, set()).add(subscriber)
+        self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.case_id)
+        if subscribers and subscriber in subscribers:
+            subscribers.discard(subscriber)
+            self._count -= 1
+            if not subscribers:
+                del self._subscribers[subscriber.case_id]
+
+    def publish(self, event: dict):
+        for subscriber in self._subscribers.get(event["case_id"], ()):
+            subscriber.offer(event)
+
+    def publish_local(self, event: dict):
+        """Publish from a write route; skipped when change streams already deliver it"""
+        if not self.change_stream_active:
+            self.publish(event)
+
+    async def _watch(self, db):
+        while True:
+            try:
+                async with db.watch(CHANGE_STREAM_PIPELINE, max_await_time_ms=CHANGE_STREAM_MAX_AWAIT_MS) as stream:
+                    # The server-side stream opens on the first fetch, which is
+                    # where standalone servers reject it
+                    change = await stream.try_next()
+                    self.change_stream_active = True
+                    logger.info("Case events driven by MongoDB change streams")
+                    while True:
+                        changes = [change] if change else []
+                        while len(changes) < CHANGE_STREAM_BATCH:
+                            change = await stream.try_next()
+                            if change is None:
+                                break
+                            changes.append(change)
+                        if changes:
+                            await self._publish_changes(db, changes)
+                        change = await stream.next()
+            except PyMongoError as e:
+                if self.change_stream_active:
+                    logger.error(f"Change stream failed, publishing from routes: {e!r}")
+                else:
+                    logger.info(f"Change streams unavailable, publishing from routes: {e!r}")
+            self.change_stream_active = False
+            await asyncio.sleep(CHANGE_STREAM_RETRY_DELAY)
+
+    async def _change_owners(self, db, changes: List[dict]) -> dict:
+        """(collection, _id) -> {id, case_id} for updated documents of subscribed cases"""
+        updated = {"cases": [], "targets": []}
+        for change in changes:
+            if change["operationType"] == "update":
+                updated[change["ns"]["coll"]].append(change["documentKey"]["_id"])
+
+        subscribed = list(self._subscribers)
+        owners = {}
+        queries = {
+            "cases": ({"_id": {"$in": updated["cases"]}, "id": {"$in": subscribed}}, {"id": 1}),
+            "targets": ({"_id": {"$in": updated["targets"]}, "case_id": {"$in": subscribed}}, {"id": 1, "case_id": 1}),
+        }
+        for collection, (query, projection) in queries.items():
+            if updated[collection]:
+                async for doc in db[collection].find(query, projection):
+                    owners[(collection, doc["_id"])] = doc
+        return owners
+
+    async def _publish_changes(self, db, changes: List[dict]):
+        """Publish a batch of changes, one "targets" event per case for several target changes"""
+        if not self._subscribers:
+            return
+        owners = await self._change_owners(db, changes)
+
+        target_events: Dict[str, List[dict]] = {}
+        for change in changes:
+            collection = change["ns"]["coll"]
+            if change["operationType"] == "insert":
+                doc = change.get("fullDocument") or {}
+                status = doc.get("status")
+            else:
+                doc = owners.get((collection, change["documentKey"]["_id"]))
+                if doc is None:
+                    continue
+                status = change["updateDescription"]["updatedFields"]["status"]
+
+            if collection == "cases":
+                self.publish({"type": "case", "case_id": doc.get("id"), "status": status})
+            elif doc.get("case_id") in self._subscribers:
+                target_events.setdefault(doc["case_id"], []).append(
+                    {"type": "target", "case_id": doc["case_id"], "id": doc.get("id"), "status": status}
+                )
+
+        for case_id, events in target_events.items():
+            if len(events) == 1:
+                self.publish(events[0])
+                continue
+            statuses = {event["status"] for event in events}
+            self.publish({
+                "type": "targets",
+                "case_id": case_id,
+                "status": statuses.pop() if len(statuses) == 1 else None,
+                "count": len(events),
+            })
+
+    def start(self, db):
+        """Start following change streams, falling back to route publishing"""
+        self._watch_task = asyncio.create_task(self._watch(db))
+
+    async def stop(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
@@ -0,0 +1,289 @@
+"""MongoDB-backed job queue for long-running case operations.
+
+Routes enqueue a job document and answer 202 straight away; a pool of
+asyncio workers runs it. Workers run inside the API process unless
+JOBS_IN_APP=0, and standalone with `python jobs.py`.
+
+Leasing works like the liveness checker: a job is due when its run_at has
+passed, and claiming it pushes run_at forward by the lease. The running
+worker renews the lease every third of it, so a job whose worker died is
+picked up again once the lease runs out, up to max_attempts times.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+
+from metrics import jobs_run
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ["queued", "running"]
+# Seconds before a failed attempt is retried, doubled per attempt
+RETRY_DELAY = 5
+
+
+class JobLeaseLost(Exception):
+    """The job's lease ran out and another worker may have claimed it"""
+
+
+class JobFailed(Exception):
+    """Raised by handlers for failures that retrying cannot fix"""
+
+
+class JobContext:
+    """Handed to a job handler: the job document plus progress reporting"""
+
+    def __init__(self, queue: "JobQueue", job: dict):
+        self.queue = queue
+        self.job = job
+        self.params = job.get("params", {})
+
+    async def progress(self, done: int, total: Optional[int] = None):
+        """Record progress and renew the lease; raises JobLeaseLost if it lapsed"""
+        fields = {"progress.done": done, "run_at": self.queue.lease_deadline()}
+        if total is not None:
+            fields["progress.total"] = total
+        result = await self.queue.collection.update_one(
+            {"id": self.job["id"], "lease_owner": self.job["lease_owner"]}, {"$set": fields}
+        )
+        if not result.matched_count:
+            raise JobLeaseLost(self.job["id"])
+
+
+Handler = Callable[[JobContext], Awaitable[Optional[dict]]]
+
+
+class JobQueue:
+    """Enqueue, claim and finish jobs in one collection.
+
+    `collection` may be set after construction, once the database is connected.
+    """
+
+    def __init__(self, collection, lease: float = 60, max_attempts: int = 3, retention: float = 7 * 24 * 60 * 60):
+        self.collection = collection
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.handlers: Dict[str, Handler] = {}
+        self._wakeup = asyncio.Event()
+
+    def handler(self, job_type: str):
+        """Register the coroutine that runs jobs of `job_type`"""
+        def register(func: Handler) -> Handler:
+            self.handlers[job_type] = func
+            return func
+        return register
+
+    def lease_deadline(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=self.lease)
+
+    async def enqueue(self, job_type: str, client_id: str, params: dict, case_id: Optional[str] = None) -> dict:
+        now = datetime.now(timezone.utc)
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "client_id": client_id,
+            "case_id": case_id,
+            "status": "queued",
+            "params": params,
+            "progress": {"done": 0, "total": None},
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "run_at": now,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+        await self.collection.insert_one(job)
+        job.pop("_id", None)
+        # Wake idle workers in this process; others find it on their next poll
+        self._wakeup.set()
+        return job
+
+    async def claim(self) -> Optional[dict]:
+        """Lease the oldest due job to this worker"""
+        now = datetime.now(timezone.utc)
+        job = await self.collection.find_one_and_update(
+            {"status": {"$in": ACTIVE_STATUSES}, "run_at": {"$lte": now}},
+            {
+                "$set": {
+                    "status": "running",
+                    "run_at": self.lease_deadline(),
+                    "lease_owner": str(uuid.uuid4()),
+                    "started_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if job:
+            job.pop("_id")
+        return job
+
+    async def finish(self, job: dict, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"id": job["id"], "lease_owner": job["lease_owner"]},
+            {
+                "$set": {
+                    "status": status,
+                    "result": result,
+                    "error": error,
+                    "finished_at": now,
+                    # Finished jobs are removed by the expires_at TTL index
+                    "expires_at": now + timedelta(seconds=self.retention),
+                },
+                "$unset": {"lease_owner": "", "run_at": ""},
+            }
+        )
+
+    async def retry(self, job: dict, error: str):
+        delay = RETRY_DELAY * 2 ** (job["attempts"] - 1)
+        await self.collection.update_one(
+            {"id": job["id"], "lease_owner": job["lease_owner"]},
+            {
+                "$set": {
+                    "status": "queued",
+                    "error": error,
+                    "run_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+                },
+                "$unset": {"lease_owner": ""},
+            }
+        )
+
+    async def _heartbeat(self, job: dict):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await self.collection.update_one(
+                {"id": job["id"], "lease_owner": job["lease_owner"]},
+                {"$set": {"run_at": self.lease_deadline()}}
+            )
+
+    async def run_job(self, job: dict) -> str:
+        """Run a claimed job to completion, retry or failure; returns its new status"""
+        handler = self.handlers.get(job["type"])
+        if handler is None:
+            await self.finish(job, "failed", error=f"Unknown job type {job['type']}")
+            return "failed"
+        if job["attempts"] > self.max_attempts:
+            # Its workers kept dying mid-run
+            await self.finish(job, "failed", error=job.get("error") or "Lease expired too many times")
+            return "failed"
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            result = await handler(JobContext(self, job))
+        except JobLeaseLost:
+            logger.warning(f"Lost the lease on job {job['id']}")
+            return "running"
+        except JobFailed as e:
+            await self.finish(job, "failed", error=str(e))
+            return "failed"
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({job['type']}) failed: {e!r}")
+            if job["attempts"] < self.max_attempts:
+                await self.retry(job, repr(e))
+                return "queued"
+            await self.finish(job, "failed", error=repr(e))
+            return "failed"
+        finally:
+            heartbeat.cancel()
+
+        await self.finish(job, "succeeded", result=result)
+        return "succeeded"
+
+    async def wait(self, timeout: float):
+        """Sleep until a job is enqueued in this process or `timeout` passes"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+class JobWorker:
+    """Pool of `concurrency` loops claiming and running jobs"""
+
+    def __init__(self, queue: JobQueue, concurrency: int = 4, poll_interval: float = 1):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks = []
+
+    async def _loop(self):
+        while True:
+            try:
+                job = await self.queue.claim()
+            except Exception as e:
+                logger.error(f"Claiming a job failed: {e!r}")
+                job = None
+            if job is None:
+                await self.queue.wait(self.poll_interval)
+                continue
+            try:
+                status = await self.queue.run_job(job)
+            except Exception as e:
+                # Recording the outcome failed; the lease will run out and retry it
+                logger.error(f"Job {job['id']} could not be finished: {e!r}")
+                status = "running"
+            jobs_run.inc(job["type"], status)
+
+    async def run_forever(self):
+        await asyncio.gather(*(self._loop() for _ in range(self.concurrency)))
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._loop()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def job_queue_from_env(collection=None) -> JobQueue:
+    return JobQueue(
+        collection,
+        lease=float(os.environ.get('JOBS_LEASE', 60)),
+        max_attempts=int(os.environ.get('JOBS_MAX_ATTEMPTS', 3)),
+        retention=float(os.environ.get('JOBS_RETENTION', 7 * 24 * 60 * 60))
+    )
+
+
+def job_worker_from_env(queue: JobQueue) -> JobWorker:
+    return JobWorker(
+        queue,
+        concurrency=int(os.environ.get('JOBS_CONCURRENCY', 4)),
+        poll_interval=float(os.environ.get('JOBS_POLL_INTERVAL', 1))
+    )
+
+
+async def main():
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent / '.env')
+    # The queue, worker settings and handlers are defined by the API module
+    import server
+
+    server.connect_db()
+    try:
+        await server.job_worker.run_forever()
+    finally:
+        server.client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""Per-client token-bucket rate limiting.
+
+Buckets are kept in the GCRA form: a single "theoretical arrival time" per
+key, which behaves exactly like a token bucket refilling at `rate` with
+capacity `burst` but fits in one number. State lives in process by default,
+or in a MongoDB collection shared by every worker.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional
+
+from cachetools import LRUCache
+from pymongo.errors import DuplicateKeyError
+
+
+@dataclass(frozen=True)
+class Limit:
+    requests: int  # bucket capacity, i.e. allowed burst
+    seconds: float  # time to refill the whole bucket
+
+    @property
+    def interval(self) -> float:
+        return self.seconds / self.requests
+
+    @classmethod
+    def parse(cls, spec: str) -> "Limit":
+        """Parse "<requests>/<seconds>", e.g. "30/60" """
+        requests, seconds = spec.split("/")
+        return cls(int(requests), float(seconds))
+
+
+def parse_limits(spec: str) -> Dict[str, Limit]:
+    """Parse "class=30/60,other=5/1" into route class limits"""
+    limits = {}
+    for item in spec.split(","):
+        if item.strip():
+            name, limit = item.split("=")
+            limits[name.strip()] = Limit.parse(limit.strip())
+    return limits
+
+
+class LocalBackend:
+    """Buckets in this process only, bounded to `maxsize` keys"""
+
+    def __init__(self, maxsize: int = 100000):
+        self._tats = LRUCache(maxsize=maxsize)
+
+    async def acquire(self, key: str, limit: Limit, now: float) -> Optional[float]:
+        tat = max(self._tats.get(key, now), now)
+        allow_at = tat - (limit.requests - 1) * limit.interval
+        if allow_at > now:
+            return allow_at - now
+        self._tats[key] = tat + limit.interval
+        return None
+
+
+class MongoBackend:
+    """Buckets shared across workers, one document per key.
+
+    The update only matches while the bucket has a token left, so the check
+    and the take are a single atomic write. A refused upsert surfaces as a
+    duplicate key error on _id.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def acquire(self, key: str, limit: Limit, now: float) -> Optional[float]:
+        threshold = now + (limit.requests - 1) * limit.interval
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=limit.seconds)
+        try:
+            await self.collection.update_one(
+                {"_id": key, "$or": [{"tat": {"$lte": threshold}}, {"tat": {"$exists": False}}]},
+                [{"$set": {
+                    "tat": {"$add": [{"$max": [{"$ifNull": ["$tat", now]}, now]}, limit.interval]},
+                    "expires_at": expires_at,
+                }}],
+                upsert=True
+            )
+            return None
+        except DuplicateKeyError:
+            doc = await self.collection.find_one({"_id": key}, {"tat": 1})
+            return max((doc or {}).get("tat", threshold) - threshold, limit.interval)
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, Limit], backend):
+        self.limits = limits
+        self.backend = backend
+
+    async def hit(self, route_class: str, client_id: str) -> Optional[float]:
+        """Take a token; returns None if allowed, else seconds until one is free"""
+        limit = self.limits.get(route_class)
+        if limit is None:
+            return None
+        return await self.backend.acquire(f"{route_class}:{client_id}", limit, time.time())
@@ -0,0 +1,151 @@
+"""Per-domain target rollups.
+
+One domain_stats document per (client, domain), plus an all-clients row per
+domain with client_id null, holding target counts by status, the last
+removal time and a histogram of created -> removed times. Writers build a
+RollupDelta for the targets they inserted or moved between statuses and
+apply it with one bulk upsert, so top-host views read a few small documents
+instead of aggregating over targets.
+
+Increments are not transactional with the target writes, so concurrent
+updates can leave the counts slightly off; rebuild() recomputes everything.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from pymongo import UpdateOne
+
+# Upper bounds, in hours, of the time-to-removal histogram buckets; the last
+# bucket holds everything slower
+REMOVAL_BUCKET_HOURS = (1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720, 1440)
+
+
+def removal_bucket(created_at: Optional[datetime], removed_at: datetime) -> Optional[int]:
+    if created_at is None:
+        return None
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    hours = (removed_at - created_at).total_seconds() / 3600
+    for index, bound in enumerate(REMOVAL_BUCKET_HOURS):
+        if hours <= bound:
+            return index
+    return len(REMOVAL_BUCKET_HOURS)
+
+
+def median_hours(histogram: Dict[str, int]) -> Optional[float]:
+    """Median time-to-removal, interpolated within its histogram bucket"""
+    counts = [histogram.get(str(i), 0) for i in range(len(REMOVAL_BUCKET_HOURS) + 1)]
+    total = sum(counts)
+    if not total:
+        return None
+    half = total / 2
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= half:
+            if index == len(REMOVAL_BUCKET_HOURS):
+                return float(REMOVAL_BUCKET_HOURS[-1])
+            lower = REMOVAL_BUCKET_HOURS[index - 1] if index else 0
+            upper = REMOVAL_BUCKET_HOURS[index]
+            return round(lower + (upper - lower) * (half - seen) / count, 1)
+        seen += count
+
+
+class RollupDelta:
+    """Changes to one client's domain rows, accumulated before writing"""
+
+    def __init__(self):
+        self.incs: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.last_removed_at: Dict[str, datetime] = {}
+
+    def __bool__(self):
+        return bool(self.incs)
+
+    def insert(self, domain: str, status: str = "pending"):
+        self.incs[domain][f"counts.{status}"] += 1
+        self.incs[domain]["total"] += 1
+
+    def transition(
+        self,
+        domain: str,
+        old_status: str,
+        new_status: str,
+        created_at: Optional[datetime] = None,
+        at: Optional[datetime] = None
+    ):
+        if old_status == new_status:
+            return
+        self.incs[domain][f"counts.{old_status}"] -= 1
+        self.incs[domain][f"counts.{new_status}"] += 1
+        if new_status == "removed":
+            self.removal(domain, created_at, at or datetime.now(timezone.utc))
+
+    def removal(self, domain: str, created_at: Optional[datetime], at: datetime):
+        """Record a removal in the last-removal time and histogram"""
+        if domain not in self.last_removed_at or at > self.last_removed_at[domain]:
+            self.last_removed_at[domain] = at
+        bucket = removal_bucket(created_at, at)
+        if bucket is not None:
+            self.incs[domain][f"removal_hours.{bucket}"] += 1
+
+    def operations(self, client_id: Optional[str], now: datetime):
+        for domain, incs in self.incs.items():
+            update = {"$inc": dict(incs), "$set": {"updated_at": now}}
+            if domain in self.last_removed_at:
+                update["$max"] = {"last_removed_at": self.last_removed_at[domain]}
+            yield UpdateOne({"client_id": client_id, "domain": domain}, update, upsert=True)
+
+
+class DomainRollups:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def apply(self, client_id: Optional[str], delta: RollupDelta):
+        """Write a client's delta to its rows and the all-clients rows.
+
+        With client_id None (the owner is unknown) only the all-clients rows
+        change; writing "its rows" too would count the delta there twice.
+        """
+        if not delta:
+            return
+        now = datetime.now(timezone.utc)
+        operations = list(delta.operations(None, now))
+        if client_id is not None:
+            operations += list(delta.operations(client_id, now))
+        await self.collection.bulk_write(operations, ordered=False)
+
+    async def record_inserts(self, client_id: str, targets: Iterable[dict]):
+        delta = RollupDelta()
+        for target in targets:
+            delta.insert(target.get("domain") or "", target.get("status", "pending"))
+        await self.apply(client_id, delta)
+
+    async def rebuild(self, targets, case_clients: Dict[str, str], scratch):
+        """Recompute every row from a cursor over all targets.
+
+        Rows are written to the empty `scratch` collection, which then
+        replaces this one, so readers never see a half-built rollup. Give
+        `scratch` this collection's indexes first; the rename keeps its own.
+        """
+        deltas: Dict[Optional[str], RollupDelta] = defaultdict(RollupDelta)
+        async for target in targets:
+            domain = target.get("domain") or ""
+            status = target.get("status", "pending")
+            removed_at = target.get("removed_at") if status == "removed" else None
+            if removed_at and removed_at.tzinfo is None:
+                removed_at = removed_at.replace(tzinfo=timezone.utc)
+            # The client's rows and the all-clients rows
+            for client_id in {case_clients.get(target["case_id"]), None}:
+                deltas[client_id].insert(domain, status)
+                if removed_at:
+                    deltas[client_id].removal(domain, target.get("created_at"), removed_at)
+
+        now = datetime.now(timezone.utc)
+        operations = [op for key, delta in deltas.items() for op in delta.operations(key, now)]
+        if not operations:
+            await self.collection.delete_many({})
+            return 0
+        await scratch.bulk_write(operations, ordered=False)
+        await scratch.rename(self.collection.name, dropTarget=True)
+        return len(operations)
@@ -0,0 +1,51 @@
+"""Multi-process entry point for the API.
+
+    python serve.py --workers 4 --port 8001
+
+Runs `server:create_app` under uvicorn's process manager. Workers are
+spawned, not forked, and each opens its own MongoDB client in the app
+lifespan, so nothing is shared between them. Size MONGO_MAX_POOL_SIZE
+with the worker count in mind: every worker holds its own pool.
+
+Behind a process supervisor that prefers gunicorn, the equivalent is
+
+    gunicorn -w 4 -k uvicorn.workers.UvicornWorker 'server:create_app()'
+
+Probe /healthz for liveness and /readyz for readiness (MongoDB reachable and
+all indexes present).
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import uvicorn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', 8001)))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)),
+        help="worker processes (default: WEB_CONCURRENCY, else one per CPU)"
+    )
+    parser.add_argument("--log-level", default=os.environ.get('LOG_LEVEL', 'info'))
+    parser.add_argument("--no-access-log", action="store_true", help="skip per-request access logs")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        "server:create_app",
+        factory=True,
+        app_dir=str(Path(__file__).parent),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        access_log=not args.no_access_log,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,59 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+from cachetools import TLRUCache
+from contextlib import asynccontextmanager
 import os
+import re
+import json
+import time
+import base64
+import hashlib
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Dict, List, Optional
+import io
+import csv
 import uuid
-from datetime import datetime, timezone, timedelta
+import zlib
+import math
+import asyncio
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from datetime import datetime, timezone
+import bson
+
+from archiver import archiver_from_env
+from checker import checker_from_env
+from compression import CompressionMiddleware
+from events import EventBus
+from jobs import (
+    ACTIVE_STATUSES as ACTIVE_JOB_STATUSES, JobFailed, job_queue_from_env, job_worker_from_env
+)
+from metrics import (
+    registry as metrics_registry, Gauge, MetricsMiddleware, MongoCommandMetrics, auth_lookups, rate_limited
+)
+from ratelimit import LocalBackend, MongoBackend, RateLimiter, parse_limits
+from rollups import DomainRollups, RollupDelta, median_hours
+from session_tokens import RevocationList, signer_from_env
+from sessions import SessionActivity, session_sid
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Create the main app without a prefix
-app = FastAPI()
+# MongoDB connection, opened per worker process by the app lifespan (see
+# connect_db) so nothing connects at import time or is shared across a fork
+client: Optional[AsyncIOMotorClient] = None
+db = None
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -50,7 +83,9 @@ class User(BaseModel):
 class UserSession(BaseModel):
     user_id: str
     session_token: str
+    sid: str  # session_sid(session_token); what signed tokens name
     expires_at: datetime
+    last_seen_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
@@ -73,6 +108,11 @@ class Case(BaseModel):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class CaseSummary(Case):
+    target_total: int = 0
+    target_counts: Dict[str, int] = {}  # target status -> count
+
+
 class CaseCreate(BaseModel):
     title: str
     description: str
@@ -84,14 +124,84 @@ class Target(BaseModel):
     case_id: str
     url: str
     domain: str
+    url_canonical: Optional[str] = None
     status: str = "pending"  # pending, filed, removed, failed
     last_checked_at: Optional[datetime] = None
+    last_status_code: Optional[int] = None
+    next_check_at: Optional[datetime] = Field(default_factory=lambda: datetime.now(timezone.utc))
+    removed_at: Optional[datetime] = None
+    created_at: Optional[datetime] = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
 class TargetCreate(BaseModel):
     urls: List[str]
 
 
+TARGET_STATUSES = ("pending", "filed", "removed", "failed")
+
+
+class TargetStatusUpdate(BaseModel):
+    status: str = Field(pattern="^(" + "|".join(TARGET_STATUSES) + ")$")
+    # Select targets by id, or by domain and/or current status
+    ids: Optional[List[str]] = None
+    domain: Optional[str] = None
+    current_status: Optional[str] = None
+
+
+class TargetStatusUpdateResult(BaseModel):
+    matched: int
+    modified: int
+    target: Optional[Target] = None  # Set when exactly one id was given
+
+
+class IngestBatch(BaseModel):
+    batch: int
+    submitted: int
+    inserted: int
+    duplicates: int
+    failed: int
+
+
+class IngestResult(BaseModel):
+    inserted: int
+    invalid: int
+    duplicates: int
+    failed: int
+    batches: List[IngestBatch]
+
+
+class JobProgress(BaseModel):
+    done: int = 0
+    total: Optional[int] = None
+
+
+class Job(BaseModel):
+    id: str
+    type: str  # add_targets, recheck_case
+    case_id: Optional[str] = None
+    status: str  # queued, running, succeeded, failed
+    progress: JobProgress
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class DomainStats(BaseModel):
+    domain: str
+    total: int = 0
+    counts: Dict[str, int] = {}  # target status -> count
+    last_removed_at: Optional[datetime] = None
+    median_hours_to_removal: Optional[float] = None
+
+
+class CaseSearchResults(BaseModel):
+    results: List[Case]
+    facets: Optional[Dict[str, Dict[str, int]]] = None  # field -> value -> count
+
+
 class PublicStats(BaseModel):
     filesRemoved: int
     activeClients: int
@@ -99,6 +209,981 @@ class PublicStats(BaseModel):
     avgResponseTime: int
 
 
+# ==================== SESSION CACHE ====================
+
+class SessionCache:
+    """Bounded LRU cache of session token -> (User, session expiry).
+
+    Entries live until the earlier of the session's own expires_at and the
+    cache TTL, so a session revoked in another worker is only trusted for at
+    most `ttl` seconds here.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache = TLRUCache(maxsize=maxsize, ttu=self._ttu, timer=time.time)
+
+    def _ttu(self, token, entry, now):
+        _, expires_at = entry
+        return min(expires_at.timestamp(), now + self.ttl)
+
+    def get(self, token: str) -> Optional[User]:
+        entry = self._cache.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def set(self, token: str, user: User, expires_at: datetime):
+        self._cache[token] = (user, expires_at)
+
+    def evict(self, token: str):
+        self._cache.pop(token, None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+session_cache = SessionCache(
+    maxsize=int(os.environ.get('SESSION_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('SESSION_CACHE_TTL', 60))
+)
+
+# Signed stateless session tokens, on when SESSION_SIGNING_KEYS is set (see
+# session_tokens.py). Revoked sessions are polled into `revocations`.
+session_signer = signer_from_env(os.environ.get('SESSION_SIGNING_KEYS', ''))
+revocations = RevocationList(None, interval=float(os.environ.get('SESSION_REVOCATION_INTERVAL', 5)))
+
+
+def forget_session(sid: str, session_token: Optional[str] = None):
+    """Stop accepting a revoked session in this process"""
+    if session_token:
+        session_cache.evict(session_token)
+    session_activity.forget(sid)
+    if session_signer:
+        # Any token issued until now expires within a lifetime from now;
+        # revocation polling prunes the entry then
+        now = datetime.now(timezone.utc)
+        revocations.add(sid, now, session_activity.expires_at(now))
+
+
+# Sliding expiry: requests note when each session was last seen here, and
+# the app lifespan flushes them in batches (see sessions.py)
+session_activity = SessionActivity(
+    None,
+    lifetime=float(os.environ.get('SESSION_LIFETIME_DAYS', 7)) * 24 * 60 * 60,
+    flush_interval=float(os.environ.get('SESSION_FLUSH_INTERVAL', 30)),
+    max_per_user=int(os.environ.get('SESSION_MAX_PER_USER', 10)),
+    sweep_interval=float(os.environ.get('SESSION_SWEEP_INTERVAL', 600)),
+    evict=forget_session
+)
+
+metrics_registry.register(Gauge(
+    "session_cache", "Session cache size, capacity and lifetime hits/misses", ("stat",),
+    collect=lambda: {(stat,): value for stat, value in session_cache.stats().items()}
+))
+
+
+# ==================== DATABASE ====================
+
+# Client options read from the environment: (env var, default). Pools are
+# per process, so a host's connection count is workers x maxPoolSize.
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", 100),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", 0),
+    "maxIdleTimeMS": ("MONGO_MAX_IDLE_TIME_MS", None),
+    "connectTimeoutMS": ("MONGO_CONNECT_TIMEOUT_MS", 5000),
+    "serverSelectionTimeoutMS": ("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+    "socketTimeoutMS": ("MONGO_SOCKET_TIMEOUT_MS", None),
+    "waitQueueTimeoutMS": ("MONGO_WAIT_QUEUE_TIMEOUT_MS", None),
+}
+
+
+def mongo_client_options() -> dict:
+    options = {}
+    for option, (env, default) in MONGO_CLIENT_OPTIONS.items():
+        value = os.environ.get(env, default)
+        if value is not None:
+            options[option] = int(value)
+    return options
+
+
+def use_db(database):
+    """Point the routes and background services at `database`"""
+    global db
+    db = database
+    job_queue.collection = database.jobs
+    session_activity.collection = database.user_sessions
+    session_activity.leases = database.leases
+    revocations.collection = database.user_sessions
+    domain_rollups.collection = database.domain_stats
+    if RATE_LIMIT_BACKEND == 'mongo':
+        rate_limiter.backend = MongoBackend(database.rate_limits)
+
+
+def connect_db():
+    """Open this process's Motor client from MONGO_URL and DB_NAME"""
+    global client
+    client = AsyncIOMotorClient(
+        os.environ['MONGO_URL'], event_listeners=[MongoCommandMetrics()], **mongo_client_options()
+    )
+    use_db(client[os.environ['DB_NAME']])
+
+
+# ==================== INDEXES ====================
+
+# Every index the routes rely on, keyed by collection. Creation is idempotent,
+# so this runs on each startup.
+INDEXES = {
+    "user_sessions": [
+        IndexModel([("session_token", ASCENDING)], name="session_token_unique", unique=True),
+        # Sessions written before sids existed get one at startup
+        IndexModel([("sid", ASCENDING)], name="sid_unique", unique=True, sparse=True),
+        # Also orders a user's sessions for the per-user cap
+        IndexModel([("user_id", ASCENDING), ("last_seen_at", DESCENDING)], name="user_id_last_seen_at"),
+        # TTL monitor deletes sessions once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+        # Revocation polling; only revoked sessions have the field
+        IndexModel([("revoked_at", ASCENDING)], name="revoked_at", sparse=True),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "cases": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Also covers the version lookups behind conditional GETs
+        IndexModel(
+            [("client_id", ASCENDING), ("id", ASCENDING), ("version", ASCENDING)],
+            name="client_id_id_version"
+        ),
+        IndexModel(
+            [("client_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="client_id_created_at_id"
+        ),
+        # Search; the client_id prefix keeps each text query to one client's entries
+        IndexModel(
+            [("client_id", ASCENDING), ("title", TEXT), ("description", TEXT)],
+            name="client_id_title_description_text",
+            weights={"title": 3, "description": 1}
+        ),
+        # Archiver claims closed cases by status and time closed
+        IndexModel([("status", ASCENDING), ("updated_at", ASCENDING)], name="status_updated_at"),
+    ],
+    "cases_archive": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("client_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="client_id_created_at_id"
+        ),
+        IndexModel([("targets_purged", ASCENDING)], name="targets_purged"),
+    ],
+    "targets_archive": [
+        IndexModel(
+            [("case_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)],
+            name="case_id_created_at_id"
+        ),
+        IndexModel(
+            [("case_id", ASCENDING), ("domain", ASCENDING), ("url_canonical", ASCENDING), ("id", ASCENDING)],
+            name="case_id_domain_url_canonical_id"
+        ),
+    ],
+    "targets": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("case_id", ASCENDING), ("status", ASCENDING)], name="case_id_status"),
+        IndexModel(
+            [("case_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)],
+            name="case_id_created_at_id"
+        ),
+        # Exports walk a case's targets grouped by domain; search looks up
+        # hosts and URL prefixes across a client's cases
+        IndexModel(
+            [("case_id", ASCENDING), ("domain", ASCENDING), ("url_canonical", ASCENDING), ("id", ASCENDING)],
+            name="case_id_domain_url_canonical_id"
+        ),
+        # Liveness checker claims due targets by status and next_check_at
+        IndexModel([("status", ASCENDING), ("next_check_at", ASCENDING)], name="status_next_check_at"),
+        # Targets written before url_canonical existed are left out of the
+        # uniqueness check rather than colliding on null
+        IndexModel(
+            [("case_id", ASCENDING), ("url_canonical", ASCENDING)],
+            name="case_id_url_canonical_unique",
+            unique=True,
+            partialFilterExpression={"url_canonical": {"$type": "string"}}
+        ),
+    ],
+    "domain_stats": [
+        # One row per (client, domain); all-clients rows have client_id null
+        IndexModel([("client_id", ASCENDING), ("domain", ASCENDING)], name="client_id_domain_unique", unique=True),
+        IndexModel([("client_id", ASCENDING), ("total", DESCENDING)], name="client_id_total"),
+    ],
+    "jobs": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Workers claim due jobs by status and run_at
+        IndexModel([("status", ASCENDING), ("run_at", ASCENDING)], name="status_run_at"),
+        IndexModel(
+            [("client_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="client_id_created_at_id"
+        ),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Options that must match for an existing index to count as present
+INDEX_OPTIONS = ("unique", "expireAfterSeconds", "partialFilterExpression")
+
+
+async def ensure_indexes():
+    """Create all declared indexes, logging (not raising) on conflicts"""
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            logger.error(f"Index creation failed for {collection}: {e}")
+
+
+async def backfill_session_ids():
+    """Give sessions created before sids existed their sid"""
+    async for session in db.user_sessions.find({"sid": {"$exists": False}}, {"session_token": 1}):
+        await db.user_sessions.update_one(
+            {"_id": session["_id"]}, {"$set": {"sid": session_sid(session["session_token"])}}
+        )
+
+
+def comparable_key(key: list, weights: Optional[dict] = None) -> list:
+    """Index key with any text fields moved to the end in name order.
+
+    Live text indexes list _fts/_ftsx in place of their fields, which only
+    appear in `weights`; pass those for live indexes.
+    """
+    text = list(weights) if weights else [name for name, kind in key if kind == TEXT]
+    plain = [(name, kind) for name, kind in key if kind != TEXT and name != "_ftsx"]
+    return plain + sorted((name, TEXT) for name in text)
+
+
+async def find_missing_indexes() -> List[dict]:
+    """Compare declared indexes against the live ones by key and options"""
+    missing = []
+    for collection, indexes in INDEXES.items():
+        existing = []
+        async for index in db[collection].list_indexes():
+            existing.append((
+                comparable_key(list(index["key"].items()), index.get("weights")),
+                {opt: index.get(opt) for opt in INDEX_OPTIONS}
+            ))
+
+        for index in indexes:
+            spec = index.document
+            key = comparable_key(list(spec["key"].items()))
+            options = {opt: spec.get(opt) for opt in INDEX_OPTIONS}
+            if (key, options) not in existing:
+                missing.append({"collection": collection, "name": spec["name"], "key": key})
+    return missing
+
+
+# ==================== PAGINATION ====================
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# GET /cases and /cases/{id}/targets returned up to 1000 items before they
+# paged, so clients that don't follow X-Next-Cursor still get that many
+LEGACY_PAGE_SIZE = MAX_PAGE_SIZE
+
+
+def encode_cursor(doc: dict) -> str:
+    """Opaque cursor pointing just past doc in (created_at, id) order"""
+    created_at = doc.get("created_at")
+    payload = [created_at.isoformat() if created_at else None, doc["id"]]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), str(doc_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(cursor: str, descending: bool) -> dict:
+    """Filter matching documents after cursor when sorted by (created_at, id)"""
+    created_at, doc_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+
+    # Documents written before created_at existed sort as null: first when
+    # ascending, last when descending.
+    if created_at is None:
+        tie = {"created_at": None, "id": {op: doc_id}}
+        return tie if descending else {"$or": [tie, {"created_at": {"$ne": None}}]}
+
+    clauses = [
+        {"created_at": {op: created_at}},
+        {"created_at": created_at, "id": {op: doc_id}},
+    ]
+    if descending:
+        clauses.append({"created_at": None})
+    return {"$or": clauses}
+
+
+async def fetch_page(
+    collection,
+    query: dict,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False,
+    projection: Optional[dict] = None
+):
+    """Fetch one keyset page, returning (docs, next_cursor)"""
+    if cursor:
+        query = {"$and": [query, keyset_filter(cursor, descending)]}
+    direction = DESCENDING if descending else ASCENDING
+
+    # Read one extra document to learn whether another page exists
+    docs = await collection.find(query, projection or {"_id": 0}).sort(
+        [("created_at", direction), ("id", direction)]
+    ).to_list(limit + 1)
+
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+def page_order(doc: dict):
+    """Sort key matching MongoDB's (created_at, id) order, nulls first"""
+    created_at = doc.get("created_at")
+    return (created_at is not None, created_at or datetime.min, doc["id"])
+
+
+def merge_pages(pages: List[List[dict]], limit: int, descending: bool, more: bool = False):
+    """Merge keyset pages read from several collections into one, returning (docs, next_cursor).
+
+    A document briefly present in two collections (while being archived) is
+    kept from the first page that has it.
+    """
+    seen = set()
+    docs = []
+    for page in pages:
+        for doc in page:
+            if doc["id"] not in seen:
+                seen.add(doc["id"])
+                docs.append(doc)
+    docs.sort(key=page_order, reverse=descending)
+
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit or (more and len(docs) == limit) else None
+    return docs[:limit], next_cursor
+
+
+async def fetch_merged_page(
+    collections: list,
+    query: dict,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = False,
+    projection: Optional[dict] = None
+):
+    """fetch_page over several collections at once, merged into one page"""
+    pages = await asyncio.gather(*(
+        fetch_page(collection, query, cursor, limit, descending, projection) for collection in collections
+    ))
+    more = any(next_cursor for _, next_cursor in pages)
+    return merge_pages([docs for docs, _ in pages], limit, descending, more)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def stream_ndjson(mongo_cursor):
+    """Yield one JSON line per document straight from a Motor cursor"""
+    async for doc in mongo_cursor:
+        yield json.dumps(doc, default=json_default) + "\n"
+
+
+# ==================== RESPONSES ====================
+
+# How list routes serialize documents:
+#   model     - build models, then FastAPI validates them again via response_model
+#   validated - validate once with a TypeAdapter and dump JSON in pydantic-core
+#   trusted   - skip validation and dump the Mongo documents with orjson
+RESPONSE_MODES = ("model", "validated", "trusted")
+RESPONSE_MODE = os.environ.get('RESPONSE_MODE', 'model')
+if RESPONSE_MODE not in RESPONSE_MODES:
+    raise ValueError(f"RESPONSE_MODE must be one of {', '.join(RESPONSE_MODES)}")
+
+_list_adapters = {}
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, or stdlib json if it isn't installed"""
+
+    def render(self, content) -> bytes:
+        if orjson:
+            return orjson.dumps(content)
+        return json.dumps(content, default=json_default, separators=(",", ":")).encode()
+
+
+def list_adapter(model):
+    if model not in _list_adapters:
+        _list_adapters[model] = TypeAdapter(List[model])
+    return _list_adapters[model]
+
+
+def model_list_response(docs: List[dict], model, response: Response):
+    """Serialize list route results according to RESPONSE_MODE.
+
+    docs must be read with fields_projection for model, as the trusted mode
+    dumps them as they are. The fast modes return a Response directly, which
+    skips response_model validation, so headers already set on `response`
+    are carried over.
+    """
+    if RESPONSE_MODE == "model":
+        return [model(**doc) for doc in docs]
+
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    if RESPONSE_MODE == "validated":
+        adapter = list_adapter(model)
+        body = adapter.dump_json(adapter.validate_python(docs))
+        return Response(body, media_type="application/json", headers=headers)
+    return FastJSONResponse(docs, headers=headers)
+
+
+def parse_fields(fields: Optional[str], model) -> Optional[List[str]]:
+    """Field names from a `fields=` sparse fieldset, checked against model.
+
+    Returns None when every field is wanted. id is always included.
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if "id" not in names:
+        names.insert(0, "id")
+    return names
+
+
+def fields_projection(names: Optional[List[str]], model, paged: bool = True) -> dict:
+    """Mongo projection reading only the requested fields, plus the cursor keys of a page.
+
+    Without a fieldset it reads model's fields, so internal ones (version,
+    leases, archive bookkeeping) never reach the unvalidated response modes.
+    """
+    if names is None:
+        names = list(model.model_fields)
+    projection = {"_id": 0, **{name: 1 for name in names}}
+    if paged:
+        projection["created_at"] = 1
+    return projection
+
+
+def sparse_list_response(docs: List[dict], names: List[str], response: Response):
+    """Serialize documents read with fields_projection as they are.
+
+    There is no model to validate partial documents against, so this works
+    like the trusted RESPONSE_MODE: fields missing from a stored document are
+    left out rather than defaulted.
+    """
+    if "created_at" not in names:
+        for doc in docs:
+            doc.pop("created_at", None)
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return FastJSONResponse(docs, headers=headers)
+
+
+# ==================== EXPORT ====================
+
+EXPORT_FIELDS = ["domain", "url", "status", "last_status_code", "last_checked_at", "removed_at", "created_at"]
+EXPORT_BATCH_ROWS = 1000
+
+
+async def stream_csv(mongo_cursor, fields: List[str]):
+    """Yield CSV text from a Motor cursor, EXPORT_BATCH_ROWS rows per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    rows = 0
+
+    async for doc in mongo_cursor:
+        writer.writerow([
+            doc[field].isoformat() if isinstance(doc.get(field), datetime) else doc.get(field, "")
+            for field in fields
+        ])
+        rows += 1
+        if rows % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+async def gzip_stream(chunks):
+    """Gzip an async stream of text chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# ==================== TARGET INGESTION ====================
+
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 1000))
+INGEST_MAX_URLS = int(os.environ.get('INGEST_MAX_URLS', 1000000))
+INGEST_MAX_LINE_BYTES = int(os.environ.get('INGEST_MAX_LINE_BYTES', 8192))
+UPLOAD_INFLATE_SIZE = 64 * 1024
+GZIP_CONTENT_TYPES = {"application/gzip", "application/x-gzip"}
+
+
+DUPLICATE_KEY_ERROR = 11000
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl",
+}
+
+TEXT_FRAGMENT_DIRECTIVE = ":~:"
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name.startswith("utm_") or name in TRACKING_PARAMS
+
+
+def canonical_host(parsed) -> str:
+    """Lowercased host of a parsed URL, with its port unless it is the scheme's default.
+
+    This is what targets store as `domain`: no userinfo, and one value per
+    host however the URL spelled it. Raises ValueError for an invalid port.
+    """
+    port = parsed.port
+    host = (parsed.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"
+    if port is not None and port != DEFAULT_PORTS.get(parsed.scheme.lower()):
+        host = f"{host}:{port}"
+    return host
+
+
+def canonicalize_url(url: str) -> str:
+    """Canonical form of a URL used to detect duplicate targets.
+
+    Lowercases the scheme and host, drops default ports and tracking
+    parameters, and sorts the remaining query parameters. The fragment is
+    kept: file hosts and single-page sites put the resource in it (mega.nz
+    `#!<id>!<key>`, `#/video/<n>`). Only text-fragment directives (`#:~:text=`),
+    which just highlight part of a page, are dropped. URLs that can't be
+    parsed are returned stripped but otherwise unchanged.
+    """
+    url = url.strip()
+    try:
+        parsed = urlparse(url)
+        host = canonical_host(parsed)
+    except ValueError:
+        return url
+
+    scheme = parsed.scheme.lower()
+    if parsed.username is not None:
+        userinfo = parsed.username
+        if parsed.password is not None:
+            userinfo += f":{parsed.password}"
+        host = f"{userinfo}@{host}"
+
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not is_tracking_param(name)
+    )
+    path = parsed.path or ("/" if host else "")
+    fragment = parsed.fragment.split(TEXT_FRAGMENT_DIRECTIVE, 1)[0]
+    return urlunparse((scheme, host, path, parsed.params, urlencode(query), fragment))
+
+
+def duplicate_indexes(error: BulkWriteError) -> set:
+    """Positions in the batch rejected by a unique index"""
+    return {
+        err["index"] for err in error.details.get("writeErrors", [])
+        if err.get("code") == DUPLICATE_KEY_ERROR
+    }
+
+
+def target_domain(url: str) -> str:
+    """Extract the canonical host from a URL, falling back to 'unknown' if it can't be parsed"""
+    try:
+        return canonical_host(urlparse(url.strip())) or "unknown"
+    except ValueError:
+        return "unknown"
+
+
+def build_target_doc(case_id: str, url: str, now: datetime) -> Optional[dict]:
+    """Build a target document for an http(s) URL, or None if the URL is invalid.
+
+    Bulk ingestion builds plain dicts with the same fields as Target rather
+    than validating one model per URL.
+    """
+    try:
+        parsed = urlparse(url)
+        domain = canonical_host(parsed)
+    except ValueError:
+        return None
+    if parsed.scheme not in ("http", "https") or not domain:
+        return None
+
+    return {
+        "id": str(uuid.uuid4()),
+        "case_id": case_id,
+        "url": url,
+        "url_canonical": canonicalize_url(url),
+        "domain": domain,
+        "status": "pending",
+        "last_checked_at": None,
+        "last_status_code": None,
+        "next_check_at": now,
+        "created_at": now,
+    }
+
+
+async def insert_target_batch(client_id: str, docs: List[dict], batch: int) -> IngestBatch:
+    """Insert one batch unordered so duplicates and bad documents don't stop the rest.
+
+    Quota for the whole batch is reserved up front and what was not inserted
+    given back afterwards.
+    """
+    await reserve_quota(client_id, "targets", len(docs))
+    inserted = duplicates = 0
+    try:
+        try:
+            await db.targets.insert_many(docs, ordered=False)
+            inserted_docs = docs
+        except BulkWriteError as e:
+            duplicates = len(duplicate_indexes(e))
+            rejected = {error["index"] for error in e.details["writeErrors"]}
+            inserted_docs = [doc for i, doc in enumerate(docs) if i not in rejected]
+        inserted = len(inserted_docs)
+    finally:
+        await release_quota(client_id, "targets", len(docs) - inserted)
+    await domain_rollups.record_inserts(client_id, inserted_docs)
+    return IngestBatch(
+        batch=batch,
+        submitted=len(docs),
+        inserted=inserted,
+        duplicates=duplicates,
+        failed=len(docs) - inserted - duplicates
+    )
+
+
+async def iter_upload_lines(request: Request):
+    """Yield lines of a newline-delimited upload, gunzipping on the fly if needed"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    gzipped = (
+        request.headers.get("content-encoding") == "gzip" or content_type in GZIP_CONTENT_TYPES
+    )
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16) if gzipped else None
+
+    buffer = b""
+
+    def split(data: bytes) -> List[bytes]:
+        nonlocal buffer
+        *lines, buffer = (buffer + data).split(b"\n")
+        # A line is one URL, so a long one means a bogus or hostile upload
+        if len(buffer) > INGEST_MAX_LINE_BYTES:
+            raise HTTPException(status_code=413, detail=f"Line exceeds {INGEST_MAX_LINE_BYTES} bytes")
+        return lines
+
+    try:
+        async for chunk in request.stream():
+            if not decompressor:
+                for line in split(chunk):
+                    yield line
+                continue
+            # Inflate at most UPLOAD_INFLATE_SIZE bytes at a time, so a small
+            # gzip bomb can't expand in memory before the line cap sees it
+            while True:
+                data = decompressor.decompress(chunk, UPLOAD_INFLATE_SIZE)
+                chunk = decompressor.unconsumed_tail
+                for line in split(data):
+                    yield line
+                if not chunk and len(data) < UPLOAD_INFLATE_SIZE:
+                    break
+        if decompressor:
+            for line in split(decompressor.flush()):
+                yield line
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Invalid gzip upload")
+
+    yield buffer
+
+
+async def ingest_target_lines(client_id: str, case_id: str, lines) -> IngestResult:
+    """Validate URLs as they arrive and insert them in bounded batches"""
+    batches = []
+    pending = []
+    invalid = 0
+    seen = 0
+    now = datetime.now(timezone.utc)
+
+    async for line in lines:
+        url = line.decode("utf-8", "replace").strip()
+        if not url:
+            continue
+
+        seen += 1
+        if seen > INGEST_MAX_URLS:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {INGEST_MAX_URLS} URLs")
+
+        doc = build_target_doc(case_id, url, now)
+        if doc is None:
+            invalid += 1
+            continue
+
+        pending.append(doc)
+        if len(pending) >= INGEST_BATCH_SIZE:
+            batches.append(await insert_target_batch(client_id, pending, len(batches)))
+            pending = []
+
+    if pending:
+        batches.append(await insert_target_batch(client_id, pending, len(batches)))
+
+    return IngestResult(
+        inserted=sum(b.inserted for b in batches),
+        invalid=invalid,
+        duplicates=sum(b.duplicates for b in batches),
+        failed=sum(b.failed for b in batches),
+        batches=batches
+    )
+
+
+async def add_case_targets(client_id: str, case_id: str, urls: List[str], progress=None) -> List[Target]:
+    """Insert a case's new targets in batches and return the ones created.
+
+    URLs repeated in `urls` or already in the case are skipped. `progress`
+    is awaited with (done, total) after each batch.
+    """
+    targets = {}
+    for url in urls:
+        url_canonical = canonicalize_url(url)
+        if url_canonical not in targets:
+            targets[url_canonical] = Target(
+                case_id=case_id,
+                url=url,
+                url_canonical=url_canonical,
+                domain=target_domain(url)
+            )
+    targets = list(targets.values())
+
+    # Insert targets; ones already in the case are rejected by the
+    # (case_id, url_canonical) unique index
+    await reserve_quota(client_id, "targets", len(targets))
+    inserted = []
+    try:
+        for start in range(0, len(targets), INGEST_BATCH_SIZE):
+            batch = targets[start:start + INGEST_BATCH_SIZE]
+            try:
+                await db.targets.insert_many([t.model_dump() for t in batch], ordered=False)
+                inserted.extend(batch)
+            except BulkWriteError as e:
+                rejected = duplicate_indexes(e)
+                if len(rejected) != len(e.details["writeErrors"]):
+                    raise
+                inserted.extend(t for i, t in enumerate(batch) if i not in rejected)
+            if progress:
+                await progress(start + len(batch), len(targets))
+    finally:
+        await release_quota(client_id, "targets", len(targets) - len(inserted))
+
+    await domain_rollups.record_inserts(client_id, ({"domain": t.domain, "status": t.status} for t in inserted))
+    if inserted:
+        await bump_case_version(case_id)
+        event_bus.publish_local({"type": "targets", "case_id": case_id, "status": "pending", "count": len(inserted)})
+    return inserted
+
+
+# ==================== PUBLIC STATS ====================
+
+# Shown until there is enough real data to report
+DEFAULT_SUCCESS_RATE = 98
+DEFAULT_AVG_RESPONSE_HOURS = 24
+
+
+async def compute_public_stats() -> PublicStats:
+    """Aggregate the public landing page numbers server-side (MongoDB 4.4+ for $unionWith)"""
+    # Removed and failed counts plus mean created -> removed time, per status,
+    # over live and archived targets
+    closed_targets = {"$match": {"status": {"$in": ["removed", "failed"]}}}
+    outcomes = {
+        row["_id"]: row
+        async for row in db.targets.aggregate([
+            closed_targets,
+            {"$unionWith": {"coll": "targets_archive", "pipeline": [closed_targets]}},
+            {"$group": {
+                "_id": "$status",
+                "count": {"$sum": 1},
+                "avg_ms": {"$avg": {"$subtract": ["$removed_at", "$created_at"]}},
+            }},
+        ])
+    }
+    removed = outcomes.get("removed", {})
+    files_removed = removed.get("count", 0)
+    files_failed = outcomes.get("failed", {}).get("count", 0)
+
+    # Count distinct clients in the database instead of shipping every id
+    active_clients = 0
+    async for row in db.cases.aggregate([
+        {"$unionWith": {"coll": "cases_archive"}},
+        {"$group": {"_id": "$client_id"}},
+        {"$count": "count"},
+    ]):
+        active_clients = row["count"]
+
+    closed = files_removed + files_failed
+    success_rate = round(100 * files_removed / closed) if closed else DEFAULT_SUCCESS_RATE
+    avg_ms = removed.get("avg_ms")
+    avg_hours = round(avg_ms / 3600000) if avg_ms is not None else DEFAULT_AVG_RESPONSE_HOURS
+
+    return PublicStats(
+        filesRemoved=max(files_removed, 10000),  # Show at least 10k
+        activeClients=max(active_clients, 250),
+        successRate=success_rate,
+        avgResponseTime=avg_hours
+    )
+
+
+class PublicStatsCache:
+    """Serves the last computed PublicStats, recomputing at most once per ttl"""
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._stats = None
+        self._computed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> PublicStats:
+        if self._stats and time.monotonic() - self._computed_at < self.ttl:
+            return self._stats
+
+        # Concurrent requests on a stale cache wait for one recompute
+        async with self._lock:
+            if not self._stats or time.monotonic() - self._computed_at >= self.ttl:
+                self._stats = await compute_public_stats()
+                self._computed_at = time.monotonic()
+        return self._stats
+
+
+public_stats = PublicStatsCache(ttl=float(os.environ.get('PUBLIC_STATS_TTL', 300)))
+
+
+# ==================== CONDITIONAL GET ====================
+
+# Cases carry a `version` counter bumped by every write to the case or its
+# targets, and users a `cases_version` bumped when any of their cases changes.
+# List and detail routes derive ETags from these without reading the
+# documents they return.
+
+def make_etag(version, *parts) -> str:
+    """Weak ETag for a version plus whatever else shapes the response"""
+    digest = hashlib.blake2s(repr(parts).encode(), digest_size=6).hexdigest()
+    return f'W/"{version or 0}-{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+async def bump_case_version(case_id: str):
+    await db.cases.update_one({"id": case_id}, {"$inc": {"version": 1}})
+
+
+async def bump_cases_version(user_id: str):
+    await db.users.update_one({"_id": user_id}, {"$inc": {"cases_version": 1}})
+
+
+# ==================== CASE EVENTS ====================
+
+SSE_HEARTBEAT_SECONDS = 15
+
+event_bus = EventBus(
+    max_subscribers=int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', 5000)),
+    max_queue=int(os.environ.get('EVENTS_MAX_QUEUE', 100))
+)
+
+
+async def stream_events(case_id: str):
+    """Yield SSE frames for a case's events, with heartbeats while idle"""
+    subscriber = event_bus.subscribe(case_id)
+    if subscriber is None:
+        return
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        event_bus.unsubscribe(subscriber)
+
+
+# ==================== ARCHIVE ====================
+
+# Closed cases move with their targets to cases_archive/targets_archive (see
+# archiver.py). Reads fall back to the archive when a case is not live;
+# writes to archived cases are refused.
+
+def case_tiers():
+    """(cases, targets) collection pairs, live first"""
+    return [(db.cases, db.targets), (db.cases_archive, db.targets_archive)]
+
+
+async def find_case(case_id: str, client_id: str, projection: dict):
+    """Return (case, archived) from the live or archive collection; case is None if neither has it"""
+    query = {"id": case_id, "client_id": client_id}
+    case = await db.cases.find_one(query, projection)
+    if case is not None:
+        return case, False
+    case = await db.cases_archive.find_one(query, projection)
+    return case, case is not None
+
+
+async def case_not_found(case_id: str, client_id: str) -> HTTPException:
+    """Error for a write to a case that is not live: 409 if archived, else 404"""
+    if await db.cases_archive.find_one({"id": case_id, "client_id": client_id}, {"_id": 1}):
+        return HTTPException(status_code=409, detail="Case is archived")
+    return HTTPException(status_code=404, detail="Case not found")
+
+
 # ==================== AUTH HELPERS ====================
 
 async def get_current_user(request: Request) -> Optional[User]:
@@ -116,28 +1201,65 @@ async def get_current_user(request: Request) -> Optional[User]:
     
     if not session_token:
         return None
-    
+
+    # Signed tokens are verified in CPU, without a cache or database lookup
+    if session_signer and session_signer.is_signed(session_token):
+        claims = session_signer.verify(session_token)
+        if claims is None or revocations.is_revoked(claims["sid"], claims["iat"]):
+            auth_lookups.inc("invalid")
+            return None
+        auth_lookups.inc("signed")
+        session_activity.touch(claims["sid"])
+        return User(
+            id=claims["uid"],
+            email=claims["email"],
+            name=claims["name"],
+            picture=claims.get("picture"),
+            created_at=claims["created_at"]
+        )
+
+    # Serve from the session cache when possible
+    sid = session_sid(session_token)
+    user = session_cache.get(session_token)
+    if user:
+        auth_lookups.inc("cache_hit")
+        session_activity.touch(sid)
+        return user
+
     # Check session
     session = await db.user_sessions.find_one({"session_token": session_token})
-    if not session:
+    if not session or session.get("revoked_at"):
+        auth_lookups.inc("missing")
         return None
-    
-    # Check expiry
+
+    # Check expiry, counting a last-seen time not yet flushed
     expires_at = session["expires_at"]
     if expires_at.tzinfo is None:
         expires_at = expires_at.replace(tzinfo=timezone.utc)
-    
+    last_seen = session_activity.last_seen(sid)
+    if last_seen:
+        expires_at = max(expires_at, session_activity.expires_at(last_seen))
+
+    # Expired documents are removed by the expires_at TTL index; it only
+    # sweeps once a minute, so reject them here in the meantime.
     if expires_at < datetime.now(timezone.utc):
-        await db.user_sessions.delete_one({"session_token": session_token})
+        session_cache.evict(session_token)
+        auth_lookups.inc("expired")
         return None
-    
+
     # Get user
     user_doc = await db.users.find_one({"_id": session["user_id"]})
     if not user_doc:
+        auth_lookups.inc("missing")
         return None
-    
+
+    auth_lookups.inc("db_hit")
+
     user_doc["id"] = user_doc.pop("_id")
-    return User(**user_doc)
+    user = User(**user_doc)
+    session_cache.set(session_token, user, expires_at)
+    session_activity.touch(sid)
+    return user
 
 
 async def require_auth(request: Request) -> User:
@@ -148,6 +1270,294 @@ async def require_auth(request: Request) -> User:
     return user
 
 
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.environ.get('ADMIN_EMAILS', '').split(',')
+    if email.strip()
+}
+
+
+async def require_admin(request: Request) -> User:
+    """Require an authenticated user listed in ADMIN_EMAILS, raise 403 otherwise"""
+    user = await require_auth(request)
+    if user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
+
+# ==================== RATE LIMITS & QUOTAS ====================
+
+# Token buckets per client and route class, as "<class>=<requests>/<seconds>".
+# RATE_LIMIT_BACKEND=mongo shares the buckets between workers.
+RATE_LIMITS = parse_limits(os.environ.get('RATE_LIMITS', 'cases=30/60,targets=120/60,ingest=10/60,jobs=10/60'))
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'local')
+
+# Switched to the shared backend once the database is connected (see use_db)
+rate_limiter = RateLimiter(RATE_LIMITS, LocalBackend())
+
+# Per-client caps, 0 for none. Usage is kept in counters on the user
+# document, so a check is one conditional $inc instead of a count.
+QUOTAS = {
+    "cases": int(os.environ.get('QUOTA_MAX_CASES', 1000)),
+    "targets": int(os.environ.get('QUOTA_MAX_TARGETS', 1000000)),
+}
+QUOTA_COUNTERS = {"cases": "case_count", "targets": "target_count"}
+
+
+async def rate_limit(user: User, route_class: str):
+    """Take a token from the client's bucket, raise 429 if it is empty"""
+    retry_after = await rate_limiter.hit(route_class, user.id)
+    if retry_after is not None:
+        rate_limited.inc(route_class)
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+
+async def count_usage(user_id: str, kind: str) -> int:
+    """Count a client's live and archived cases or targets; only used to seed a missing counter"""
+    usage = 0
+    for cases, targets in case_tiers():
+        if kind == "cases":
+            usage += await cases.count_documents({"client_id": user_id})
+        else:
+            case_ids = await cases.distinct("id", {"client_id": user_id})
+            usage += await targets.count_documents({"case_id": {"$in": case_ids}})
+    return usage
+
+
+async def reserve_quota(user_id: str, kind: str, amount: int):
+    """Add `amount` to the client's usage counter, raise 403 if it would pass the quota"""
+    if amount <= 0:
+        return
+    field, limit = QUOTA_COUNTERS[kind], QUOTAS[kind]
+    query = {"_id": user_id}
+    if limit:
+        query[field] = {"$lte": limit - amount}
+    else:
+        query[field] = {"$exists": True}
+
+    result = await db.users.update_one(query, {"$inc": {field: amount}})
+    if result.matched_count:
+        return
+
+    user_doc = await db.users.find_one({"_id": user_id}, {field: 1})
+    if user_doc is not None and field not in user_doc:
+        # Users created before quotas existed: count once, then retry
+        usage = await count_usage(user_id, kind)
+        await db.users.update_one({"_id": user_id, field: {"$exists": False}}, {"$set": {field: usage}})
+        return await reserve_quota(user_id, kind, amount)
+    raise HTTPException(status_code=403, detail=f"Quota exceeded: at most {limit} {kind} per client")
+
+
+async def release_quota(user_id: str, kind: str, amount: int):
+    """Give back usage reserved for writes that did not happen"""
+    if amount > 0:
+        await db.users.update_one({"_id": user_id}, {"$inc": {QUOTA_COUNTERS[kind]: -amount}})
+
+
+# ==================== JOBS ====================
+
+# add_targets requests above JOBS_INLINE_MAX_URLS run as jobs. Job documents
+# carry the URLs, and 100k long URLs can pass MongoDB's 16MB document limit,
+# so their encoded params are capped by size as well as by count.
+JOBS_INLINE_MAX_URLS = int(os.environ.get('JOBS_INLINE_MAX_URLS', 1000))
+JOBS_MAX_URLS = int(os.environ.get('JOBS_MAX_URLS', 100000))
+JOBS_MAX_PARAMS_BYTES = int(os.environ.get('JOBS_MAX_PARAMS_BYTES', 8 * 1024 * 1024))
+JOB_PROJECTION = {"_id": 0, "params": 0, "lease_owner": 0, "run_at": 0, "expires_at": 0}
+
+job_queue = job_queue_from_env()
+job_worker = job_worker_from_env(job_queue)
+
+
+def job_accepted(job: dict) -> JSONResponse:
+    """202 response pointing at the job's status endpoint"""
+    return JSONResponse(
+        status_code=202,
+        content=Job(**job).model_dump(mode="json"),
+        headers={"Location": f"/api/jobs/{job['id']}"}
+    )
+
+
+@job_queue.handler("add_targets")
+async def run_add_targets(ctx) -> dict:
+    urls = ctx.params["urls"]
+    try:
+        inserted = await add_case_targets(ctx.job["client_id"], ctx.job["case_id"], urls, ctx.progress)
+    except HTTPException as e:
+        raise JobFailed(e.detail)
+    return {"inserted": len(inserted), "duplicates": len(urls) - len(inserted)}
+
+
+@job_queue.handler("recheck_case")
+async def run_recheck_case(ctx) -> dict:
+    case_id = ctx.job["case_id"]
+    case = await db.cases.find_one({"id": case_id}, {"_id": 0, "id": 1, "priority": 1, "client_id": 1})
+    if case is None:
+        raise JobFailed("Case not found")
+
+    checker = checker_from_env(db)
+    try:
+        result = await checker.check_case(case, ctx.progress)
+    finally:
+        await checker.close()
+
+    await bump_case_version(case_id)
+    if result["removed"]:
+        event_bus.publish_local({"type": "targets", "case_id": case_id, "status": "removed", "count": result["removed"]})
+    return result
+
+
+async def normalize_target_domains() -> int:
+    """Rewrite `domain` on targets stored with the raw netloc (mixed case, default port, userinfo)"""
+    fixed = 0
+    for _, targets in case_tiers():
+        updates = []
+        async for target in targets.find({}, {"_id": 1, "url": 1, "domain": 1}).batch_size(EXPORT_BATCH_ROWS):
+            domain = target_domain(target.get("url") or "")
+            if domain != target.get("domain"):
+                updates.append(UpdateOne({"_id": target["_id"]}, {"$set": {"domain": domain}}))
+            if len(updates) >= INGEST_BATCH_SIZE:
+                await targets.bulk_write(updates, ordered=False)
+                fixed += len(updates)
+                updates = []
+        if updates:
+            await targets.bulk_write(updates, ordered=False)
+            fixed += len(updates)
+    return fixed
+
+
+@job_queue.handler("rebuild_domain_stats")
+async def run_rebuild_domain_stats(ctx) -> dict:
+    # Archived targets still count towards the rollups
+    case_clients = {}
+    for cases, _ in case_tiers():
+        async for case in cases.find({}, {"_id": 0, "id": 1, "client_id": 1}):
+            case_clients[case["id"]] = case["client_id"]
+    await normalize_target_domains()
+    scratch = db[f"{domain_rollups.collection.name}_rebuild"]
+    await scratch.drop()
+    await scratch.create_indexes(INDEXES["domain_stats"])
+
+    async def all_targets():
+        for _, targets in case_tiers():
+            async for target in targets.find(
+                {}, {"_id": 0, "case_id": 1, "domain": 1, "status": 1, "created_at": 1, "removed_at": 1}
+            ).batch_size(EXPORT_BATCH_ROWS):
+                yield target
+
+    return {"rows": await domain_rollups.rebuild(all_targets(), case_clients, scratch)}
+
+
+# ==================== DOMAIN ROLLUPS ====================
+
+# Maintained by the target write paths and the checker; see rollups.py
+domain_rollups = DomainRollups(None)
+DEFAULT_TOP_DOMAINS = 50
+
+
+def domain_stats_model(doc: dict) -> DomainStats:
+    return DomainStats(
+        domain=doc["domain"],
+        total=doc.get("total", 0),
+        counts={status: count for status, count in doc.get("counts", {}).items() if count},
+        last_removed_at=doc.get("last_removed_at"),
+        median_hours_to_removal=median_hours(doc.get("removal_hours", {}))
+    )
+
+
+async def top_domains(client_id: Optional[str], limit: int) -> List[DomainStats]:
+    """Domains with the most targets, for one client or all (client_id None)"""
+    rows = await db.domain_stats.find({"client_id": client_id}, {"_id": 0}).sort(
+        "total", DESCENDING
+    ).to_list(limit)
+    return [domain_stats_model(row) for row in rows]
+
+
+# ==================== SEARCH ====================
+
+# Values returned per facet field
+FACET_SIZE = 20
+
+
+async def facet_counts(collection, match: dict, fields: List[str]) -> Dict[str, Dict[str, int]]:
+    """Count matching documents by the values of each field, top FACET_SIZE per field"""
+    rows = await collection.aggregate([
+        {"$match": match},
+        {"$facet": {
+            field: [
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+                {"$sort": {"count": DESCENDING, "_id": ASCENDING}},
+                {"$limit": FACET_SIZE},
+            ]
+            for field in fields
+        }},
+    ]).to_list(1)
+    return {
+        field: {row["_id"]: row["count"] for row in rows[0][field] if row["_id"] is not None}
+        for field in fields
+    }
+
+
+def normalize_domain(domain: str) -> str:
+    """A host given as a parameter, in the form targets store it as `domain`.
+
+    Takes "host[:port]" or a URL. Without a scheme to say which port is the
+    default, both 80 and 443 are dropped. Values that don't parse are only
+    stripped and lowercased.
+    """
+    domain = domain.strip()
+    try:
+        if "://" in domain:
+            return canonical_host(urlparse(domain)) or domain.lower()
+        parsed = urlparse("//" + domain)
+        host = canonical_host(parsed)
+        if parsed.port in DEFAULT_PORTS.values():
+            host = host.rsplit(":", 1)[0]
+    except ValueError:
+        return domain.lower()
+    return host or domain.lower()
+
+
+async def cases_with_targets(client_id: str, domain: Optional[str], url: Optional[str]) -> List[str]:
+    """Ids of the client's cases with a target on `domain` or under the `url` prefix.
+
+    Each of the client's cases is one seek on the
+    (case_id, domain, url_canonical, id) index, so popular hosts shared with
+    other clients cost nothing extra.
+    """
+    query = {"case_id": {"$in": await db.cases.distinct("id", {"client_id": client_id})}}
+    if url:
+        prefix = canonicalize_url(url)
+        query["url_canonical"] = {"$regex": "^" + re.escape(prefix)}
+        domain = domain or target_domain(prefix)
+    query["domain"] = normalize_domain(domain)
+    return await db.targets.distinct("case_id", query)
+
+
+async def search_facets(client_id: str, query: dict) -> Dict[str, Dict[str, int]]:
+    """Case counts by status and priority, and target counts by domain, for a search.
+
+    Unfiltered searches take the domain counts from the client's rollups
+    rather than grouping every one of their targets.
+    """
+    async def domain_counts():
+        if query == {"client_id": client_id}:
+            rows = await db.domain_stats.find(
+                {"client_id": client_id}, {"_id": 0, "domain": 1, "total": 1}
+            ).sort("total", DESCENDING).to_list(FACET_SIZE)
+            return {"domain": {row["domain"]: row["total"] for row in rows if row.get("total")}}
+        case_ids = [case["id"] async for case in db.cases.find(query, {"_id": 0, "id": 1})]
+        return await facet_counts(db.targets, {"case_id": {"$in": case_ids}}, ["domain"])
+
+    case_counts, target_counts = await asyncio.gather(
+        facet_counts(db.cases, query, ["status", "priority"]), domain_counts()
+    )
+    return {**case_counts, **target_counts}
+
+
 # ==================== ROUTES ====================
 
 @api_router.get("/")
@@ -156,16 +1566,84 @@ async def root():
 
 
 # Auth endpoints
+def session_id(session_token: str) -> Optional[str]:
+    """The sid of the session a cookie stands for, opaque or signed"""
+    if session_signer and session_signer.is_signed(session_token):
+        claims = session_signer.verify(session_token)
+        return claims["sid"] if claims else None
+    return session_sid(session_token) if session_token else None
+
+
+def signed_session_token(sid: str, user: User) -> str:
+    return session_signer.issue(
+        {
+            "sid": sid,
+            "uid": user.id,
+            "email": user.email,
+            "name": user.name,
+            "picture": user.picture,
+            "created_at": user.created_at.isoformat(),
+        },
+        session_activity.expires_at(datetime.now(timezone.utc))
+    )
+
+
+def set_session_cookie(response: Response, sid: str, session_token: str, user: User):
+    """Set the session cookie: a token signed for sid when SESSION_SIGNING_KEYS is set, else session_token"""
+    response.set_cookie(
+        key="session_token",
+        value=signed_session_token(sid, user) if session_signer else session_token,
+        httponly=True,
+        secure=True,
+        samesite="none",
+        max_age=int(session_activity.lifetime),
+        path="/"
+    )
+
+
+async def revoke_session(sid: str):
+    """End a session everywhere.
+
+    The document is marked rather than deleted so workers checking signed
+    tokens see the revocation; it is kept until every token issued for it
+    has expired.
+    """
+    now = datetime.now(timezone.utc)
+    session = await db.user_sessions.find_one_and_update(
+        {"sid": sid},
+        {"$set": {"revoked_at": now}, "$max": {"expires_at": session_activity.expires_at(now)}},
+        projection={"_id": 0, "session_token": 1}
+    )
+    forget_session(sid, session["session_token"] if session else None)
+
+
 @api_router.get("/auth/me")
-async def get_me(request: Request):
+async def get_me(request: Request, response: Response):
     user = await require_auth(request)
+    # The session slides server-side; renew the cookie (or its signed
+    # expiry) to match
+    cookie = request.cookies.get("session_token")
+    sid = session_id(cookie or "")
+    if sid and session_signer and session_signer.is_signed(cookie):
+        # A reissued token's iat is later than any revocation this worker has
+        # not polled yet, which would outlive it; check the session first
+        session = await db.user_sessions.find_one({"sid": sid}, {"_id": 0, "revoked_at": 1})
+        if session is None or session.get("revoked_at"):
+            if session is not None:
+                revoked_at = session["revoked_at"]
+                if revoked_at.tzinfo is None:
+                    revoked_at = revoked_at.replace(tzinfo=timezone.utc)
+                revocations.add(sid, revoked_at, session_activity.expires_at(revoked_at))
+            raise HTTPException(status_code=401, detail="Not authenticated")
+    if sid:
+        set_session_cookie(response, sid, cookie, user)
     # Convert to dict and ensure 'id' field is used instead of '_id'
     user_dict = user.model_dump()
     return user_dict
 
 
 @api_router.post("/auth/session")
-async def create_session(session_data: SessionData, response: Response):
+async def create_session(session_data: SessionData, request: Request, response: Response):
     """Process Emergent OAuth session and create user/session"""
     try:
         # Check if user exists
@@ -186,24 +1664,33 @@ async def create_session(session_data: SessionData, response: Response):
             existing_user["id"] = existing_user.pop("_id")
             user = User(**existing_user)
         
-        # Create session
+        # Create or refresh the session
+        now = datetime.now(timezone.utc)
         session = UserSession(
             user_id=session_data.id,
             session_token=session_data.session_token,
-            expires_at=datetime.now(timezone.utc) + timedelta(days=7)
+            sid=session_sid(session_data.session_token),
+            expires_at=session_activity.expires_at(now),
+            last_seen_at=now,
+            created_at=now
         )
-        await db.user_sessions.insert_one(session.model_dump())
+        await db.user_sessions.update_one(
+            {"session_token": session.session_token, "user_id": session.user_id},
+            {
+                "$set": session.model_dump(include={"sid", "expires_at", "last_seen_at"}),
+                "$setOnInsert": {"created_at": session.created_at},
+                "$unset": {"revoked_at": ""},
+            },
+            upsert=True
+        )
+
+        # Logging in again from the same browser replaces its old session
+        previous = session_id(request.cookies.get("session_token") or "")
+        if previous and previous != session.sid:
+            await revoke_session(previous)
         
         # Set httpOnly cookie
-        response.set_cookie(
-            key="session_token",
-            value=session_data.session_token,
-            httponly=True,
-            secure=True,
-            samesite="none",
-            max_age=7 * 24 * 60 * 60,  # 7 days
-            path="/"
-        )
+        set_session_cookie(response, session.sid, session.session_token, user)
         
         return {"user": user, "message": "Session created"}
     except Exception as e:
@@ -213,9 +1700,9 @@ async def create_session(session_data: SessionData, response: Response):
 
 @api_router.post("/auth/logout")
 async def logout(request: Request, response: Response):
-    session_token = request.cookies.get("session_token")
-    if session_token:
-        await db.user_sessions.delete_one({"session_token": session_token})
+    sid = session_id(request.cookies.get("session_token") or "")
+    if sid:
+        await revoke_session(sid)
     
     response.delete_cookie(key="session_token", path="/")
     return {"message": "Logged out"}
@@ -223,15 +1710,41 @@ async def logout(request: Request, response: Response):
 
 # Cases endpoints
 @api_router.get("/cases", response_model=List[Case])
-async def get_cases(request: Request):
+async def get_cases(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(LEGACY_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None
+):
+    """List the user's live and archived cases newest first; the next page cursor is sent in X-Next-Cursor.
+
+    fields=a,b returns only those case fields (and id).
+    """
     user = await require_auth(request)
-    cases = await db.cases.find({"client_id": user.id}).to_list(1000)
-    return [Case(**case) for case in cases]
+    names = parse_fields(fields, Case)
+
+    owner = await db.users.find_one({"_id": user.id}, {"_id": 0, "cases_version": 1}) or {}
+    etag = make_etag(owner.get("cases_version"), "cases", cursor, limit, names, RESPONSE_MODE)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    cases, next_cursor = await fetch_merged_page(
+        [db.cases, db.cases_archive], {"client_id": user.id}, cursor, limit, descending=True,
+        projection=fields_projection(names, Case)
+    )
+    set_next_cursor(response, next_cursor)
+    if names is not None:
+        return sparse_list_response(cases, names, response)
+    return model_list_response(cases, Case, response)
 
 
 @api_router.post("/cases", response_model=Case)
 async def create_case(case_input: CaseCreate, request: Request):
     user = await require_auth(request)
+    await rate_limit(user, "cases")
+    await reserve_quota(user.id, "cases", 1)
     
     case = Case(
         client_id=user.id,
@@ -240,114 +1753,653 @@ async def create_case(case_input: CaseCreate, request: Request):
         priority=case_input.priority or "normal"
     )
     
-    await db.cases.insert_one(case.model_dump())
+    await db.cases.insert_one({**case.model_dump(), "version": 0})
+    await bump_cases_version(user.id)
     return case
 
 
 @api_router.get("/cases/{case_id}", response_model=Case)
-async def get_case(case_id: str, request: Request):
+async def get_case(case_id: str, request: Request, response: Response):
     user = await require_auth(request)
+
+    # Revalidation is answered from the (client_id, id, version) index alone
+    if request.headers.get("if-none-match"):
+        case, _ = await find_case(case_id, user.id, {"_id": 0, "version": 1})
+        if case is None:
+            raise HTTPException(status_code=404, detail="Case not found")
+        etag = make_etag(case.get("version"), "case", case_id)
+        if etag_matches(request, etag):
+            return not_modified(etag)
     
-    case = await db.cases.find_one({"id": case_id, "client_id": user.id})
+    case, _ = await find_case(case_id, user.id, {"_id": 0})
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     
+    response.headers["ETag"] = make_etag(case.get("version"), "case", case_id)
     return Case(**case)
 
 
 @api_router.patch("/cases/{case_id}", response_model=Case)
 async def update_case(case_id: str, status: str, request: Request):
     user = await require_auth(request)
+    await rate_limit(user, "cases")
     
-    result = await db.cases.update_one(
+    case = await db.cases.find_one_and_update(
         {"id": case_id, "client_id": user.id},
-        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}}
+        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Case not found")
+    if not case:
+        raise await case_not_found(case_id, user.id)
     
-    case = await db.cases.find_one({"id": case_id})
+    await bump_cases_version(user.id)
+    event_bus.publish_local({"type": "case", "case_id": case_id, "status": status})
     return Case(**case)
 
 
 # Targets endpoints
 @api_router.get("/cases/{case_id}/targets", response_model=List[Target])
-async def get_targets(case_id: str, request: Request):
+async def get_targets(
+    case_id: str,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(LEGACY_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    fields: Optional[str] = None
+):
+    """List a case's targets oldest first.
+
+    format=json returns one page and sends the next page cursor in
+    X-Next-Cursor; format=ndjson streams every target from the cursor onwards.
+    fields=a,b returns only those target fields (and id), read from MongoDB
+    with a projection.
+    """
     user = await require_auth(request)
+    names = parse_fields(fields, Target)
     
-    # Verify case belongs to user
-    case = await db.cases.find_one({"id": case_id, "client_id": user.id})
-    if not case:
+    # Verify case belongs to user; the version read is index-covered
+    case, archived = await find_case(case_id, user.id, {"_id": 0, "version": 1})
+    if case is None:
         raise HTTPException(status_code=404, detail="Case not found")
-    
-    targets = await db.targets.find({"case_id": case_id}).to_list(1000)
-    return [Target(**target) for target in targets]
+    collection = db.targets_archive if archived else db.targets
+
+    etag = make_etag(case.get("version"), "targets", case_id, cursor, limit, format, names, RESPONSE_MODE)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+
+    if format == "ndjson":
+        query = {"case_id": case_id}
+        if cursor:
+            query = {"$and": [query, keyset_filter(cursor, descending=False)]}
+        targets = collection.find(query, fields_projection(names, Target, paged=False)).sort(
+            [("created_at", ASCENDING), ("id", ASCENDING)]
+        ).batch_size(MAX_PAGE_SIZE)
+        return StreamingResponse(stream_ndjson(targets), media_type="application/x-ndjson", headers={"ETag": etag})
+
+    targets, next_cursor = await fetch_page(
+        collection, {"case_id": case_id}, cursor, limit, projection=fields_projection(names, Target)
+    )
+    set_next_cursor(response, next_cursor)
+    if names is not None:
+        return sparse_list_response(targets, names, response)
+    return model_list_response(targets, Target, response)
 
 
 @api_router.post("/cases/{case_id}/targets", response_model=List[Target])
-async def add_targets(case_id: str, target_input: TargetCreate, request: Request):
+async def add_targets(case_id: str, target_input: TargetCreate, request: Request, response: Response):
+    """Add targets and return the ones created.
+
+    URLs already in the case, or repeated in the request, are skipped and
+    counted in the X-Duplicates-Skipped header. Requests with more than
+    JOBS_INLINE_MAX_URLS URLs are queued instead and answered with 202 and
+    the job.
+    """
     user = await require_auth(request)
+    await rate_limit(user, "targets")
     
     # Verify case belongs to user
-    case = await db.cases.find_one({"id": case_id, "client_id": user.id})
+    case = await db.cases.find_one({"id": case_id, "client_id": user.id}, {"_id": 1})
     if not case:
-        raise HTTPException(status_code=404, detail="Case not found")
+        raise await case_not_found(case_id, user.id)
     
-    # Create targets
-    targets = []
-    for url in target_input.urls:
-        # Extract domain from URL
-        try:
-            from urllib.parse import urlparse
-            domain = urlparse(url).netloc
-        except:
-            domain = "unknown"
-        
-        target = Target(
-            case_id=case_id,
-            url=url,
-            domain=domain
+    if len(target_input.urls) > JOBS_INLINE_MAX_URLS:
+        if len(target_input.urls) > JOBS_MAX_URLS:
+            raise HTTPException(
+                status_code=413, detail=f"At most {JOBS_MAX_URLS} URLs per request; use /targets/bulk"
+            )
+        params = {"urls": target_input.urls}
+        if len(bson.encode(params)) > JOBS_MAX_PARAMS_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"At most {JOBS_MAX_PARAMS_BYTES} bytes of URLs per request; use /targets/bulk",
+            )
+        job = await job_queue.enqueue("add_targets", user.id, params, case_id=case_id)
+        return job_accepted(job)
+
+    inserted = await add_case_targets(user.id, case_id, target_input.urls)
+    response.headers["X-Duplicates-Skipped"] = str(len(target_input.urls) - len(inserted))
+    return inserted
+
+
+def target_status_fields(status: str, now: datetime) -> dict:
+    """Fields to set alongside a target status change"""
+    fields = {"status": status}
+    if status == "removed":
+        fields.update(removed_at=now, next_check_at=None)
+    elif status in ("pending", "filed"):
+        # Let the checker confirm the new state soon
+        fields.update(next_check_at=now, unchanged_checks=0)
+    else:
+        fields["next_check_at"] = None
+    return fields
+
+
+@api_router.patch("/cases/{case_id}/targets", response_model=TargetStatusUpdateResult)
+async def update_target_status(case_id: str, update: TargetStatusUpdate, request: Request):
+    """Move a set of a case's targets to a new status in one write.
+
+    Targets are selected by `ids`, or by `domain` and/or `current_status`.
+    Targets already in the new status are left alone (keeping their
+    removed_at and check schedule) and not counted as matched.
+    """
+    user = await require_auth(request)
+    await rate_limit(user, "targets")
+
+    # Verify case belongs to user
+    case = await db.cases.find_one({"id": case_id, "client_id": user.id}, {"_id": 1})
+    if not case:
+        raise await case_not_found(case_id, user.id)
+
+    query = {"case_id": case_id}
+    if update.ids is not None:
+        query["id"] = {"$in": update.ids}
+    if update.domain is not None:
+        query["domain"] = normalize_domain(update.domain)
+    if update.current_status is not None:
+        query["status"] = update.current_status
+    if len(query) == 1:
+        raise HTTPException(status_code=400, detail="Provide ids, domain or current_status")
+
+    now = datetime.now(timezone.utc)
+    fields = target_status_fields(update.status, now)
+    changes = {"$set": fields}
+    rollup = RollupDelta()
+
+    if update.ids is not None and len(update.ids) == 1:
+        query["id"] = update.ids[0]
+        before = await db.targets.find_one_and_update(
+            {"$and": [query, {"status": {"$ne": update.status}}]}, changes, projection={"_id": 0}, return_document=ReturnDocument.BEFORE
         )
-        targets.append(target)
-    
-    # Insert targets
-    if targets:
-        await db.targets.insert_many([t.model_dump() for t in targets])
-    
-    return targets
+        target = {**before, **fields} if before else None
+        count = 1 if target else 0
+        if target:
+            rollup.transition(before.get("domain") or "", before["status"], update.status, before.get("created_at"), now)
+            await domain_rollups.apply(user.id, rollup)
+            await bump_case_version(case_id)
+            event_bus.publish_local({
+                "type": "target", "case_id": case_id, "id": target["id"], "status": update.status
+            })
+        return TargetStatusUpdateResult(
+            matched=count, modified=count, target=Target(**target) if target else None
+        )
+
+    # Read what is about to change for the domain rollups; a target changed
+    # concurrently between this and the update can be miscounted
+    query = {"$and": [query, {"status": {"$ne": update.status}}]}
+    changing = db.targets.find(
+        query, {"_id": 0, "domain": 1, "status": 1, "created_at": 1}
+    ).batch_size(EXPORT_BATCH_ROWS)
+    async for target in changing:
+        rollup.transition(target.get("domain") or "", target["status"], update.status, target.get("created_at"), now)
+
+    result = await db.targets.update_many(query, changes)
+    if result.modified_count:
+        await domain_rollups.apply(user.id, rollup)
+        await bump_case_version(case_id)
+        # One summary event rather than one per target
+        event_bus.publish_local({
+            "type": "targets", "case_id": case_id, "status": update.status, "count": result.modified_count
+        })
+    return TargetStatusUpdateResult(matched=result.matched_count, modified=result.modified_count)
+
+
+@api_router.get("/cases/{case_id}/targets/export")
+async def export_targets(
+    case_id: str,
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    status: Optional[str] = None
+):
+    """Stream every target of a case grouped by domain, as CSV or NDJSON.
+
+    Rows come straight off an index-ordered Motor cursor, so memory stays
+    flat however large the case is. gzip=true compresses the stream into a
+    .gz download.
+    """
+    user = await require_auth(request)
+
+    # Verify case belongs to user
+    case, archived = await find_case(case_id, user.id, {"_id": 1})
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    query = {"case_id": case_id}
+    if status:
+        query["status"] = status
+    projection = {"_id": 0, **{field: 1 for field in EXPORT_FIELDS}}
+    collection = db.targets_archive if archived else db.targets
+    targets = collection.find(query, projection).sort(
+        [("domain", ASCENDING), ("url_canonical", ASCENDING), ("id", ASCENDING)]
+    ).batch_size(EXPORT_BATCH_ROWS)
+
+    if format == "csv":
+        body, media_type = stream_csv(targets, EXPORT_FIELDS), "text/csv"
+    else:
+        body, media_type = stream_ndjson(targets), "application/x-ndjson"
+
+    filename = f"case-{case_id}-targets.{format}"
+    if gzip:
+        body, media_type, filename = gzip_stream(body), "application/gzip", filename + ".gz"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@api_router.post("/cases/{case_id}/targets/bulk", response_model=IngestResult)
+async def add_targets_bulk(case_id: str, request: Request):
+    """Add targets from a newline-delimited body, optionally gzip-compressed.
+
+    Send text/plain, or gzip it with Content-Encoding: gzip or
+    Content-Type: application/gzip. Lines that are not http(s) URLs are
+    counted as invalid and skipped.
+    """
+    user = await require_auth(request)
+    await rate_limit(user, "ingest")
+
+    # Verify case belongs to user
+    case = await db.cases.find_one({"id": case_id, "client_id": user.id}, {"_id": 1})
+    if not case:
+        raise await case_not_found(case_id, user.id)
+
+    try:
+        result = await ingest_target_lines(user.id, case_id, iter_upload_lines(request))
+    except HTTPException:
+        # Batches before the quota or size limit was hit are already stored
+        await bump_case_version(case_id)
+        raise
+    if result.inserted:
+        await bump_case_version(case_id)
+        event_bus.publish_local({"type": "targets", "case_id": case_id, "status": "pending", "count": result.inserted})
+    return result
+
+
+@api_router.post("/cases/{case_id}/recheck", status_code=202, response_model=Job)
+async def recheck_case(case_id: str, request: Request):
+    """Queue a liveness check of every pending/filed target of the case.
+
+    While one is queued or running for the case, that job is returned
+    instead of a new one.
+    """
+    user = await require_auth(request)
+    await rate_limit(user, "jobs")
+
+    # Verify case belongs to user
+    case = await db.cases.find_one({"id": case_id, "client_id": user.id}, {"_id": 1})
+    if not case:
+        raise await case_not_found(case_id, user.id)
+
+    job = await db.jobs.find_one(
+        {"client_id": user.id, "case_id": case_id, "type": "recheck_case", "status": {"$in": ACTIVE_JOB_STATUSES}},
+        JOB_PROJECTION
+    )
+    if job is None:
+        job = await job_queue.enqueue("recheck_case", user.id, {}, case_id=case_id)
+    return job_accepted(job)
+
+
+@api_router.get("/cases/{case_id}/events")
+async def case_events(case_id: str, request: Request):
+    """Server-Sent Events stream of status changes to a case and its targets.
+
+    Events are `case`, `target` (one target), `targets` (a bulk change with a
+    count) and `resync`, sent when the client fell behind and should refetch.
+    """
+    user = await require_auth(request)
+
+    # Verify case belongs to user
+    case = await db.cases.find_one({"id": case_id, "client_id": user.id}, {"_id": 1})
+    if not case:
+        raise await case_not_found(case_id, user.id)
+
+    if event_bus.subscriber_count >= event_bus.max_subscribers:
+        raise HTTPException(status_code=503, detail="Too many event subscribers", headers={"Retry-After": "30"})
+
+    return StreamingResponse(
+        stream_events(case_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Jobs endpoints
+@api_router.get("/jobs", response_model=List[Job])
+async def get_jobs(
+    request: Request,
+    response: Response,
+    case_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """List the current user's jobs, newest first"""
+    user = await require_auth(request)
+
+    query = {"client_id": user.id}
+    if case_id:
+        query["case_id"] = case_id
+    jobs, next_cursor = await fetch_page(db.jobs, query, cursor, limit, descending=True, projection=JOB_PROJECTION)
+    set_next_cursor(response, next_cursor)
+    return [Job(**job) for job in jobs]
+
+
+@api_router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, request: Request):
+    user = await require_auth(request)
+
+    job = await db.jobs.find_one({"id": job_id, "client_id": user.id}, JOB_PROJECTION)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return Job(**job)
 
 
 # Stats endpoint
 @api_router.get("/stats/public", response_model=PublicStats)
-async def get_public_stats():
-    """Get public statistics"""
-    # Count removed targets
-    files_removed = await db.targets.count_documents({"status": "removed"})
-    
-    # Count active users with cases
-    active_clients = await db.cases.distinct("client_id")
-    
-    return PublicStats(
-        filesRemoved=max(files_removed, 10000),  # Show at least 10k
-        activeClients=max(len(active_clients), 250),
-        successRate=98,
-        avgResponseTime=24
+async def get_public_stats(response: Response):
+    """Get public statistics, served from the in-memory stats cache"""
+    response.headers["Cache-Control"] = f"public, max-age={int(public_stats.ttl)}"
+    return await public_stats.get()
+
+
+# Dashboard endpoints
+@api_router.get("/dashboard/cases", response_model=List[CaseSummary])
+async def get_dashboard_cases(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """List the user's cases newest first with target totals by status.
+
+    One aggregation per tier covers the page: cases come from the
+    (client_id, created_at, id) index and each $lookup groups that case's
+    targets on the (case_id, status) index (MongoDB 5.0+ for $lookup with
+    both localField and pipeline). Live and archived cases are read side by
+    side and merged. Pages like GET /cases.
+    """
+    user = await require_auth(request)
+
+    match = {"client_id": user.id}
+    if cursor:
+        match = {"$and": [match, keyset_filter(cursor, descending=True)]}
+
+    pages = await asyncio.gather(*(
+        cases.aggregate([
+            {"$match": match},
+            {"$sort": {"created_at": DESCENDING, "id": DESCENDING}},
+            {"$limit": limit + 1},
+            {"$lookup": {
+                "from": targets.name,
+                "localField": "id",
+                "foreignField": "case_id",
+                "pipeline": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+                "as": "target_counts",
+            }},
+            {"$project": fields_projection(None, CaseSummary)},
+        ]).to_list(limit + 1)
+        for cases, targets in case_tiers()
+    ))
+    cases, next_cursor = merge_pages(pages, limit, descending=True)
+    set_next_cursor(response, next_cursor)
+
+    for case in cases:
+        counts = {row["_id"]: row["count"] for row in case["target_counts"]}
+        case["target_counts"] = counts
+        case["target_total"] = sum(counts.values())
+    return model_list_response(cases, CaseSummary, response)
+
+
+# Search endpoints
+@api_router.get("/search/cases", response_model=CaseSearchResults)
+async def search_cases(
+    request: Request,
+    response: Response,
+    q: Optional[str] = Query(None, max_length=200),
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    domain: Optional[str] = None,
+    url: Optional[str] = Query(None, max_length=2048),
+    facets: bool = True,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Search the user's cases, newest first.
+
+    q is matched against titles and descriptions through the text index;
+    domain and url keep cases with a target on that host or under that URL
+    prefix. Facets count the whole result set by case status and priority
+    and by target domain, and come with the first page only. Pages like
+    GET /cases.
+    """
+    user = await require_auth(request)
+
+    query = {"client_id": user.id}
+    if q and q.strip():
+        query["$text"] = {"$search": q}
+    if status:
+        query["status"] = status
+    if priority:
+        query["priority"] = priority
+    if domain or url:
+        query["id"] = {"$in": await cases_with_targets(user.id, domain, url)}
+
+    page = fetch_page(db.cases, query, cursor, limit, descending=True)
+    if facets and not cursor:
+        (cases, next_cursor), counts = await asyncio.gather(page, search_facets(user.id, query))
+    else:
+        (cases, next_cursor), counts = await page, None
+
+    set_next_cursor(response, next_cursor)
+    return CaseSearchResults(results=[Case(**case) for case in cases], facets=counts)
+
+
+# Domain endpoints
+@api_router.get("/domains", response_model=List[DomainStats])
+async def get_domains(request: Request, limit: int = Query(DEFAULT_TOP_DOMAINS, ge=1, le=MAX_PAGE_SIZE)):
+    """The current user's top hosts by number of targets"""
+    user = await require_auth(request)
+    return await top_domains(user.id, limit)
+
+
+@api_router.get("/domains/{domain}", response_model=DomainStats)
+async def get_domain(domain: str, request: Request):
+    user = await require_auth(request)
+
+    row = await db.domain_stats.find_one({"client_id": user.id, "domain": normalize_domain(domain)}, {"_id": 0})
+    if not row:
+        raise HTTPException(status_code=404, detail="Domain not found")
+    return domain_stats_model(row)
+
+
+# Admin endpoints
+@api_router.get("/admin/domains", response_model=List[DomainStats])
+async def get_all_domains(request: Request, limit: int = Query(DEFAULT_TOP_DOMAINS, ge=1, le=MAX_PAGE_SIZE)):
+    """Top hosts across all clients"""
+    await require_admin(request)
+    return await top_domains(None, limit)
+
+
+@api_router.post("/admin/domains/rebuild", status_code=202, response_model=Job)
+async def rebuild_domains(request: Request):
+    """Queue a full recompute of the domain rollups from the targets"""
+    user = await require_admin(request)
+    job = await job_queue.enqueue("rebuild_domain_stats", user.id, {})
+    return job_accepted(job)
+
+
+@api_router.get("/admin/indexes")
+async def check_indexes(request: Request):
+    """Report declared indexes that are missing or differ from the live ones"""
+    await require_admin(request)
+    missing = await find_missing_indexes()
+    return {"ok": not missing, "missing": missing}
+
+
+# ==================== HEALTH ====================
+
+# Indexes only need confirming once per worker; they are not dropped at runtime
+indexes_ready = False
+
+
+async def check_readiness() -> dict:
+    """Ping MongoDB and confirm the declared indexes exist"""
+    global indexes_ready
+    checks = {"mongo": "ok", "indexes": "ok"}
+    try:
+        await db.command("ping")
+        if not indexes_ready:
+            missing = await find_missing_indexes()
+            indexes_ready = not missing
+            if missing:
+                checks["indexes"] = "missing: " + ", ".join(f"{m['collection']}.{m['name']}" for m in missing)
+    except PyMongoError as e:
+        checks["mongo"] = f"unavailable: {e.__class__.__name__}"
+        checks["indexes"] = "unknown"
+    return checks
+
+
+async def healthz():
+    """Liveness: the worker is serving requests"""
+    return {"status": "ok"}
+
+
+async def readyz():
+    """Readiness: MongoDB answers and every declared index exists"""
+    checks = await check_readiness()
+    ready = all(value == "ok" for value in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": checks}
     )
 
 
-# Include the router in the main app
-app.include_router(api_router)
+async def metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+# ==================== APP ====================
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker startup and shutdown: Mongo client, indexes and background tasks"""
+    owns_client = db is None
+    if owns_client:
+        connect_db()
+
+    try:
+        await ensure_indexes()
+        await backfill_session_ids()
+    except PyMongoError as e:
+        # Keep serving; /readyz reports not ready until Mongo and the indexes are there
+        logger.error(f"Index creation failed: {e!r}")
+
+    # Target liveness checker, run in-process when CHECKER_ENABLED is set
+    checker = checker_task = None
+    if os.environ.get('CHECKER_ENABLED', '').lower() in ('1', 'true', 'yes'):
+        checker = checker_from_env(db)
+        checker_task = asyncio.create_task(
+            checker.run_forever(float(os.environ.get('CHECKER_INTERVAL', 60)))
+        )
+
+    # Archival of closed cases, run in-process when ARCHIVE_ENABLED is set
+    archiver_task = None
+    if os.environ.get('ARCHIVE_ENABLED', '').lower() in ('1', 'true', 'yes'):
+        archiver_task = asyncio.create_task(
+            archiver_from_env(db).run_forever(float(os.environ.get('ARCHIVE_INTERVAL', 3600)))
+        )
+
+    event_bus.start(db)
+
+    # Session last-seen flushes, and revocation polling for signed tokens
+    sessions_task = asyncio.create_task(session_activity.run_forever())
+    revocations_task = asyncio.create_task(revocations.run_forever()) if session_signer else None
+
+    # Job workers, run in-process unless JOBS_IN_APP=0 (then run `python jobs.py`)
+    if os.environ.get('JOBS_IN_APP', '1').lower() in ('1', 'true', 'yes'):
+        job_worker.start()
+
+    try:
+        yield
+    finally:
+        await event_bus.stop()
+        await job_worker.stop()
+        session_tasks = [task for task in (sessions_task, revocations_task) if task]
+        for task in session_tasks:
+            task.cancel()
+        await asyncio.gather(*session_tasks, return_exceptions=True)
+        try:
+            await session_activity.flush()
+        except PyMongoError as e:
+            logger.error(f"Final session flush failed: {e!r}")
+        if checker_task:
+            checker_task.cancel()
+            await asyncio.gather(checker_task, return_exceptions=True)
+            await checker.close()
+        if archiver_task:
+            archiver_task.cancel()
+            await asyncio.gather(archiver_task, return_exceptions=True)
+        if owns_client:
+            client.close()
+
+
+def create_app() -> FastAPI:
+    """Build the ASGI app. Serve with `uvicorn --factory server:create_app`,
+    or several processes with `python serve.py --workers N`."""
+    app = FastAPI(lifespan=lifespan)
+
+    # Include the router in the main app
+    app.include_router(api_router)
+
+    app.add_api_route("/metrics", metrics, include_in_schema=False)
+    app.add_api_route("/healthz", healthz, include_in_schema=False)
+    app.add_api_route("/readyz", readyz, include_in_schema=False)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Duplicates-Skipped", "ETag", "Retry-After"],
+    )
+
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_level=COMPRESSION_GZIP_LEVEL,
+        brotli_quality=COMPRESSION_BROTLI_QUALITY,
+    )
+
+    app.add_middleware(MetricsMiddleware)
+    return app
 
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+# Building the app opens no connections, so `uvicorn server:app` still works
+app = create_app()
@@ -0,0 +1,152 @@
+"""Signed, stateless session tokens.
+
+With SESSION_SIGNING_KEYS set, the session cookie carries the user's id,
+name, email and picture in an HMAC-SHA256 signed, expiring payload:
+
+    v2.<base64url JSON payload>.<base64url signature>
+
+Verifying one is a hash over a few hundred bytes, so authenticated requests
+need no database or cache lookup. The payload also names the session
+document by its `sid`, a hash of the session token (the token itself is a
+credential and the payload is only encoded), and when it was issued
+(`iat`). Sessions are revoked by marking that document, and every worker
+polls the marks into a RevocationList, so a logout takes effect everywhere
+within the poll interval. A revocation rejects tokens issued up to the time
+it was made, so logging in again to the same session works straight away.
+
+The first key signs; every key verifies, so keys can be rotated by
+prepending a new one and dropping the old one a session lifetime later.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# v1 tokens carried the raw session token and no iat; they are no longer accepted
+TOKEN_PREFIX = "v2."
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class SessionSigner:
+    def __init__(self, keys: List[bytes]):
+        if not keys:
+            raise ValueError("At least one signing key is required")
+        self.keys = keys
+
+    @staticmethod
+    def is_signed(token: str) -> bool:
+        return token.startswith(TOKEN_PREFIX)
+
+    def _signature(self, key: bytes, body: str) -> bytes:
+        return hmac.new(key, body.encode(), hashlib.sha256).digest()
+
+    def issue(self, claims: dict, expires_at: datetime) -> str:
+        """Sign `claims` (JSON-serializable) into a token valid until expires_at, issued now"""
+        claims = {**claims, "iat": round(time.time(), 3), "exp": int(expires_at.timestamp())}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        body = TOKEN_PREFIX + payload
+        return f"{body}.{_b64encode(self._signature(self.keys[0], body))}"
+
+    def verify(self, token: str, now: Optional[float] = None) -> Optional[dict]:
+        """The claims of a valid, unexpired token, else None"""
+        body, _, signature = token.rpartition(".")
+        if not body.startswith(TOKEN_PREFIX):
+            return None
+        try:
+            signature = _b64decode(signature)
+        except ValueError:
+            return None
+        if not any(hmac.compare_digest(self._signature(key, body), signature) for key in self.keys):
+            return None
+        try:
+            claims = json.loads(_b64decode(body[len(TOKEN_PREFIX):]))
+        except ValueError:
+            return None
+        if claims.get("exp", 0) <= (now or time.time()):
+            return None
+        return claims
+
+
+def signer_from_env(value: str) -> Optional[SessionSigner]:
+    """Signer for a comma-separated key list, or None when signed tokens are off"""
+    keys = [key.strip().encode() for key in value.split(",") if key.strip()]
+    return SessionSigner(keys) if keys else None
+
+
+class RevocationList:
+    """When each revoked session id was revoked, polled from the user_sessions collection.
+
+    `collection` may be set after construction, once the database is
+    connected. Entries are dropped once the session has expired, as no token
+    issued before the revocation can verify any more.
+    """
+
+    def __init__(self, collection, interval: float = 5):
+        self.collection = collection
+        self.interval = interval
+        self._revoked: Dict[str, Tuple[float, datetime]] = {}  # sid -> (revoked at, session expiry)
+        self._since: Optional[datetime] = None
+
+    def is_revoked(self, sid: str, issued_at: float) -> bool:
+        """Whether a token for sid issued at `issued_at` (epoch seconds) was revoked since"""
+        entry = self._revoked.get(sid)
+        return entry is not None and issued_at <= entry[0]
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def add(self, sid: str, revoked_at: datetime, expires_at: datetime):
+        """Revoke in this process straight away, ahead of the next poll"""
+        revoked = revoked_at.timestamp()
+        if sid in self._revoked:
+            # A later revocation covers more tokens; never move one back
+            revoked = max(revoked, self._revoked[sid][0])
+        self._revoked[sid] = (revoked, expires_at)
+
+    async def refresh(self) -> int:
+        """Load revocations since the last poll (all of them on the first)"""
+        now = datetime.now(timezone.utc)
+        query = {"revoked_at": {"$exists": True}}
+        if self._since:
+            # Overlap polls so marks written just before the last one are not missed
+            query = {"revoked_at": {"$gte": self._since - timedelta(seconds=self.interval)}}
+        loaded = 0
+        projection = {"_id": 0, "sid": 1, "revoked_at": 1, "expires_at": 1}
+        async for session in self.collection.find(query, projection):
+            if "sid" not in session:
+                continue
+            revoked_at, expires_at = session["revoked_at"], session.get("expires_at") or now
+            if revoked_at.tzinfo is None:
+                revoked_at = revoked_at.replace(tzinfo=timezone.utc)
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            self.add(session["sid"], revoked_at, expires_at)
+            loaded += 1
+        self._since = now
+
+        for sid in [sid for sid, (_, expires_at) in self._revoked.items() if expires_at < now]:
+            del self._revoked[sid]
+        return loaded
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Revocation refresh failed: {e!r}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,171 @@
+"""Sliding session expiry with batched writes.
+
+Every authenticated request moves its session's expiry to last-seen plus
+the session lifetime. Writing that per request would turn every read into
+a write, so requests only note the time in memory and a background task
+flushes the latest times in one unordered bulk_write every flush_interval
+seconds. The update uses $max, so flushes from several workers never move
+a session backwards.
+
+Sessions are identified by `sid`, a hash of the session token stored on
+the document, so signed tokens can name their session without carrying the
+token itself.
+
+The same task caps each user's sessions at max_per_user, revoking the least
+recently seen. The cap needs a full pass over the collection, so workers
+take turns through a lease document in `leases`: whoever holds it sweeps
+and renews it, the rest skip, and another worker takes over once a dead
+holder's lease runs out. Revoked sessions are marked with revoked_at rather than
+deleted, so workers verifying signed tokens can learn of them (see
+session_tokens.py); the expires_at TTL index removes them later.
+"""
+
+import asyncio
+import base64
+import hashlib
+import logging
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Dict, List, Optional
+
+from pymongo import DESCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# _id of the document in `leases` held by the worker running the cap sweep
+SWEEP_LEASE = "session_cap"
+
+
+def session_sid(session_token: str) -> str:
+    """The id of the session behind a session token"""
+    digest = hashlib.blake2b(session_token.encode(), digest_size=16).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+class SessionActivity:
+    """Last-seen times by session id, awaiting a flush to the user_sessions collection.
+
+    `collection` and `leases` may be set after construction, once the
+    database is connected; without `leases` every worker sweeps. `evict` is
+    called with the sid and token of each session the cap revokes.
+    """
+
+    def __init__(
+        self,
+        collection,
+        lifetime: float = 7 * 24 * 60 * 60,
+        flush_interval: float = 30,
+        max_per_user: int = 10,
+        sweep_interval: float = 600,
+        evict: Optional[Callable[[str, str], None]] = None,
+        leases=None
+    ):
+        self.collection = collection
+        self.leases = leases
+        self.lease_owner = str(uuid.uuid4())
+        self.lifetime = lifetime
+        self.flush_interval = flush_interval
+        self.max_per_user = max_per_user
+        self.sweep_interval = sweep_interval
+        self.evict = evict
+        self._seen: Dict[str, datetime] = {}
+
+    def expires_at(self, seen: datetime) -> datetime:
+        return seen + timedelta(seconds=self.lifetime)
+
+    def touch(self, sid: str, now: Optional[datetime] = None):
+        self._seen[sid] = now or datetime.now(timezone.utc)
+
+    def last_seen(self, sid: str) -> Optional[datetime]:
+        """The unflushed last-seen time of a session, if any"""
+        return self._seen.get(sid)
+
+    def forget(self, sid: str):
+        self._seen.pop(sid, None)
+
+    async def flush(self) -> int:
+        """Write the pending last-seen times and extended expiries"""
+        if not self._seen:
+            return 0
+        seen, self._seen = self._seen, {}
+        try:
+            await self.collection.bulk_write([
+                UpdateOne(
+                    {"sid": sid},
+                    {"$max": {"last_seen_at": at, "expires_at": self.expires_at(at)}}
+                )
+                for sid, at in seen.items()
+            ], ordered=False)
+        except PyMongoError:
+            # Retry on the next flush, unless a newer touch replaced them
+            for sid, at in seen.items():
+                self._seen.setdefault(sid, at)
+            raise
+        return len(seen)
+
+    async def claim_sweep(self) -> bool:
+        """Take or renew the sweep lease; False while another worker holds it"""
+        if self.leases is None:
+            return True
+        now = datetime.now(timezone.utc)
+        try:
+            # Twice the interval, so the holder renews it before it runs out
+            await self.leases.update_one(
+                {"_id": SWEEP_LEASE, "$or": [{"owner": self.lease_owner}, {"until": {"$lt": now}}]},
+                {"$set": {"owner": self.lease_owner, "until": now + timedelta(seconds=2 * self.sweep_interval)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def cap_sessions(self) -> List[str]:
+        """Revoke each user's least recently seen sessions beyond max_per_user (0 for no cap)"""
+        removed = []
+        if self.max_per_user <= 0:
+            return removed
+        live = {"revoked_at": {"$exists": False}}
+        async for row in self.collection.aggregate([
+            {"$match": live},
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": self.max_per_user}}},
+        ]):
+            # Login sets last_seen_at; sessions from before it did lack one and sort last
+            oldest = self.collection.find({"user_id": row["_id"], **live}, {"_id": 0, "session_token": 1}).sort(
+                [("last_seen_at", DESCENDING), ("created_at", DESCENDING)]
+            ).skip(self.max_per_user)
+            tokens = [session["session_token"] async for session in oldest]
+            await self.collection.update_many(
+                {"session_token": {"$in": tokens}}, {"$set": {"revoked_at": datetime.now(timezone.utc)}}
+            )
+            removed.extend(tokens)
+
+        for token in removed:
+            sid = session_sid(token)
+            self.forget(sid)
+            if self.evict:
+                self.evict(sid, token)
+        return removed
+
+    async def run_forever(self):
+        """Flush every flush_interval seconds and, holding the lease, cap sessions every sweep_interval"""
+        last_sweep = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Session flush failed: {e!r}")
+
+            if time.monotonic() - last_sweep >= self.sweep_interval:
+                last_sweep = time.monotonic()
+                try:
+                    if not await self.claim_sweep():
+                        continue
+                    removed = await self.cap_sessions()
+                    if removed:
+                        logger.info(f"Revoked {len(removed)} sessions over the per-user cap")
+                except Exception as e:
+                    logger.error(f"Session sweep failed: {e!r}")
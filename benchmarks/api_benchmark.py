@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Load test for the /api surface.
+
+Seeds users, cases and targets, then runs each scenario with --concurrency
+async clients calling the app in-process for --duration seconds. Prints a
+summary table to stderr and writes JSON results (RPS, p50/p95/p99 latency,
+errors) to --output, or stdout, so runs can be diffed for regressions.
+
+    python benchmarks/api_benchmark.py --mock --duration 5
+    python benchmarks/api_benchmark.py --mongo-url mongodb://localhost:27017 --output bench.json
+
+Scenarios: auth (GET /auth/me), cases (GET /cases), targets
+(GET /cases/{id}/targets), ingest (POST /cases/{id}/targets, 10 new URLs per
+request) and stats (GET /stats/public). stats needs a real MongoDB and is
+skipped with --mock.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from common import app_client, drop_database, percentile, seed_session, server, use_database
+
+SCENARIOS = ["auth", "cases", "targets", "ingest", "stats"]
+# Use aggregation stages mongomock does not implement ($unionWith)
+MONGODB_ONLY_SCENARIOS = {"stats"}
+INGEST_URLS_PER_REQUEST = 10
+
+
+async def seed(db, args):
+    """Insert users with sessions, their cases, and targets for each case"""
+    users = []
+    now = datetime.now(timezone.utc)
+    for u in range(args.users):
+        user_id = f"bench-user-{u}"
+        headers = await seed_session(db, user_id)
+        cases = [
+            {
+                "id": str(uuid.uuid4()),
+                "client_id": user_id,
+                "title": f"Bench case {c}",
+                "description": "Seeded by api_benchmark",
+                "status": "submitted",
+                "priority": random.choice(["normal", "normal", "high", "urgent"]),
+                "version": 0,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for c in range(args.cases_per_user)
+        ]
+        await db.cases.insert_many(cases)
+
+        for case in cases:
+            targets = [
+                server.build_target_doc(case["id"], f"https://host{t % 200}.example.com/{case['id']}/{t}", now)
+                for t in range(args.targets_per_case)
+            ]
+            if targets:
+                await db.targets.insert_many(targets)
+
+        users.append({"headers": headers, "case_ids": [case["id"] for case in cases]})
+    return users
+
+
+def make_request(scenario, user, counter):
+    """(method, path, kwargs) for one request of a scenario"""
+    case_id = random.choice(user["case_ids"])
+    if scenario == "auth":
+        return "GET", "/api/auth/me", {}
+    if scenario == "cases":
+        return "GET", "/api/cases", {"params": {"limit": 50}}
+    if scenario == "targets":
+        return "GET", f"/api/cases/{case_id}/targets", {"params": {"limit": 100}}
+    if scenario == "ingest":
+        n = next(counter)
+        urls = [f"https://ingest.example.com/{n}/{i}" for i in range(INGEST_URLS_PER_REQUEST)]
+        return "POST", f"/api/cases/{case_id}/targets", {"json": {"urls": urls}}
+    if scenario == "stats":
+        return "GET", "/api/stats/public", {}
+    raise ValueError(f"Unknown scenario {scenario}")
+
+
+async def run_scenario(client, scenario, users, args):
+    latencies = []
+    errors = 0
+    counter = itertools.count()
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(worker_id):
+        nonlocal errors
+        user = users[worker_id % len(users)]
+        while time.perf_counter() < deadline:
+            method, path, kwargs = make_request(scenario, user, counter)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, headers=user["headers"], **kwargs)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def run(args):
+    random.seed(args.seed)
+    db = use_database(args.mock, args.mongo_url)
+    if not args.mock:
+        await server.ensure_indexes()
+
+    seed_start = time.perf_counter()
+    users = await seed(db, args)
+    seed_seconds = time.perf_counter() - seed_start
+
+    results = {}
+    async with app_client(timeout=None) as client:
+        for scenario in args.scenarios:
+            results[scenario] = await run_scenario(client, scenario, users, args)
+            r = results[scenario]
+            print(
+                f"{scenario:<8} {r['rps']:>9.1f} rps  p50 {r['p50_ms']:>8.2f}ms  "
+                f"p95 {r['p95_ms']:>8.2f}ms  p99 {r['p99_ms']:>8.2f}ms  errors {r['errors']}",
+                file=sys.stderr
+            )
+
+    await drop_database(args.mock)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "backend": "mongomock" if args.mock else "mongodb",
+        "config": {
+            "users": args.users,
+            "cases_per_user": args.cases_per_user,
+            "targets_per_case": args.targets_per_case,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "response_mode": server.RESPONSE_MODE,
+        },
+        "seed_seconds": round(seed_seconds, 2),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mock", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--mongo-url", help="MongoDB to benchmark against (default: MONGO_URL)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--cases-per-user", type=int, default=20)
+    parser.add_argument("--targets-per-case", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients per scenario")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--seed", type=int, default=0, help="random seed for request selection")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+    if args.mock:
+        skipped = [scenario for scenario in args.scenarios if scenario in MONGODB_ONLY_SCENARIOS]
+        if skipped:
+            print(f"Skipping {', '.join(skipped)} under --mock; it needs a real MongoDB", file=sys.stderr)
+        args.scenarios = [scenario for scenario in args.scenarios if scenario not in MONGODB_ONLY_SCENARIOS]
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
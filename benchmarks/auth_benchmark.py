@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Auth-only throughput benchmark.
+
+Runs GET /api/auth/me with --concurrency async clients for --duration
+seconds, then calls get_current_user directly in a loop, under each session
+mode:
+
+    db      opaque token with the session cache off: two MongoDB reads per request
+    cached  opaque token served from the in-process session cache
+    signed  HMAC-signed stateless token (SESSION_SIGNING_KEYS): no lookups
+
+Prints a table to stderr and writes JSON results to --output, or stdout.
+
+    python benchmarks/auth_benchmark.py --mongo-url mongodb://localhost:27017
+    python benchmarks/auth_benchmark.py --mock --duration 3 --modes cached signed
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+from starlette.requests import Request
+
+from common import app_client, drop_database, percentile, seed_session, server, use_database
+from session_tokens import SessionSigner
+
+MODES = ["db", "cached", "signed"]
+
+
+async def request_load(client, headers, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get("/api/auth/me", headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def lookup_rate(headers, duration):
+    """get_current_user calls/sec for one request, without the HTTP stack"""
+    request = Request({
+        "type": "http",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        if await server.get_current_user(request) is None:
+            raise RuntimeError("Benchmark session was rejected")
+        calls += 1
+    return round(calls / (time.perf_counter() - start), 1)
+
+
+async def run(args):
+    db = use_database(args.mock, args.mongo_url)
+    results = {}
+    try:
+        headers = await seed_session(db, "bench-auth-user")
+        sid = server.session_sid(headers["Authorization"][len("Bearer "):])
+        user_doc = await db.users.find_one({"_id": "bench-auth-user"})
+        user = server.User(**user_doc)
+
+        async with app_client() as client:
+            for mode in args.modes:
+                server.session_signer = SessionSigner([b"bench-signing-key"]) if mode == "signed" else None
+                server.session_cache = server.SessionCache(ttl=0 if mode == "db" else 60)
+                mode_headers = headers
+                if mode == "signed":
+                    mode_headers = {"Authorization": f"Bearer {server.signed_session_token(sid, user)}"}
+
+                r = await request_load(client, mode_headers, args.concurrency, args.duration)
+                r["lookups_per_sec"] = await lookup_rate(mode_headers, args.duration)
+                results[mode] = r
+                print(
+                    f"{mode:<7} {r['rps']:>9.1f} req/s  p50 {r['p50_ms']:>7.2f}ms  p99 {r['p99_ms']:>7.2f}ms  "
+                    f"{r['lookups_per_sec']:>11.1f} lookups/s  errors {r['errors']}",
+                    file=sys.stderr
+                )
+    finally:
+        await drop_database(args.mock)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "mock": args.mock,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mock", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--mongo-url", help="MongoDB to benchmark against (default: MONGO_URL)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=5, help="seconds per mode and measurement")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
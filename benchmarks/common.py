@@ -0,0 +1,80 @@
+"""Shared setup for the benchmark scripts: database selection, seeding and stats"""
+
+import os
+import sys
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Measure the API itself, not the per-client rate limits and quotas
+os.environ.setdefault("RATE_LIMITS", "")
+os.environ.setdefault("QUOTA_MAX_CASES", "0")
+os.environ.setdefault("QUOTA_MAX_TARGETS", "0")
+
+import httpx  # noqa: E402
+import server  # noqa: E402
+
+
+def use_database(mock: bool, mongo_url: str = None):
+    """Point the app at mongomock-motor or a throwaway "<DB_NAME>_bench" database"""
+    if mock:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--mock needs mongomock-motor: pip install -r benchmarks/requirements.txt")
+        server.use_db(AsyncMongoMockClient()["bench"])
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        server.client = AsyncIOMotorClient(mongo_url or os.environ["MONGO_URL"], **server.mongo_client_options())
+        server.use_db(server.client[bench_db_name()])
+    return server.db
+
+
+def bench_db_name() -> str:
+    return f"{os.environ['DB_NAME']}_bench"
+
+
+async def drop_database(mock: bool):
+    if not mock:
+        await server.client.drop_database(server.db.name)
+
+
+async def seed_session(db, user_id: str = None):
+    """Insert a user with a live session and return its auth headers"""
+    user_id = user_id or f"bench-user-{uuid.uuid4()}"
+    token = f"bench_session_{uuid.uuid4()}"
+    now = datetime.now(timezone.utc)
+    await db.users.update_one(
+        {"_id": user_id},
+        {"$setOnInsert": {"email": f"{user_id}@example.com", "name": "Bench", "created_at": now}},
+        upsert=True
+    )
+    await db.user_sessions.insert_one({
+        "user_id": user_id,
+        "session_token": token,
+        "sid": server.session_sid(token),
+        "expires_at": now + timedelta(days=1),
+        "created_at": now
+    })
+    return {"Authorization": f"Bearer {token}"}
+
+
+def app_client(**kwargs) -> httpx.AsyncClient:
+    """HTTP client that calls the ASGI app in-process"""
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=server.app), base_url="http://bench", **kwargs
+    )
+
+
+def make_urls(count: int, prefix: str = "files"):
+    return [f"https://host{i % 500}.example.com/{prefix}/{i}?ref=bench" for i in range(count)]
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
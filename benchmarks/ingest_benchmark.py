@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Target ingestion throughput benchmark.
+
+Drives POST /api/cases/{id}/targets (JSON) and POST /api/cases/{id}/targets/bulk
+(plain and gzip) in-process and reports URLs/sec for each. Runs against the
+MONGO_URL from backend/.env using a throwaway "<DB_NAME>_bench" database, or
+against mongomock-motor with --mock, which only smoke-tests the paths; take
+numbers from a real mongod.
+
+    python benchmarks/ingest_benchmark.py --urls 100000
+"""
+
+import argparse
+import asyncio
+import gzip
+import time
+from datetime import datetime, timezone
+
+from common import app_client, drop_database, make_urls, seed_session, server, use_database
+
+
+async def new_case(client, headers):
+    response = await client.post("/api/cases", json={"title": "bench", "description": "bench"}, headers=headers)
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def timed(label, count, coro):
+    start = time.perf_counter()
+    result = await coro
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count:>9} URLs {elapsed:>8.2f}s {count / elapsed:>12,.0f} URLs/sec")
+    return result
+
+
+async def run(args):
+    use_database(args.mock, args.mongo_url)
+    if not args.mock:
+        await server.ensure_indexes()
+
+    urls = make_urls(args.urls)
+    body = "\n".join(urls).encode()
+
+    async with app_client(timeout=None) as client:
+        headers = await seed_session(server.db)
+
+        async def parse_only():
+            now = datetime.now(timezone.utc)
+            return [server.build_target_doc("bench", url, now) for url in urls]
+
+        await timed("parse + validate", len(urls), parse_only())
+
+        case_id = await new_case(client, headers)
+        await timed("JSON add_targets", len(urls), client.post(
+            f"/api/cases/{case_id}/targets", json={"urls": urls}, headers=headers
+        ))
+
+        case_id = await new_case(client, headers)
+        await timed("bulk text/plain", len(urls), client.post(
+            f"/api/cases/{case_id}/targets/bulk", content=body,
+            headers={**headers, "Content-Type": "text/plain"}
+        ))
+
+        case_id = await new_case(client, headers)
+        response = await timed("bulk gzip", len(urls), client.post(
+            f"/api/cases/{case_id}/targets/bulk", content=gzip.compress(body),
+            headers={**headers, "Content-Type": "application/gzip"}
+        ))
+        result = response.json()
+        print(f"gzip upload: {len(gzip.compress(body)):,} bytes, "
+              f"{result['inserted']} inserted in {len(result['batches'])} batches")
+
+    await drop_database(args.mock)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=100000, help="URLs per run")
+    parser.add_argument("--mock", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--mongo-url", help="MongoDB to benchmark against (default: MONGO_URL)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
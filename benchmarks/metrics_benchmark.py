@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Metrics instrumentation overhead benchmark.
+
+Times a trivial ASGI app called directly with and without MetricsMiddleware,
+and the Mongo command listener's started/succeeded pair, reporting the added
+cost per request and per command in microseconds.
+
+    python benchmarks/metrics_benchmark.py --iterations 200000
+"""
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from common import server  # noqa: F401  (puts backend/ on sys.path)
+from metrics import MetricsMiddleware, MongoCommandMetrics
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def time_app(app, iterations):
+    route = SimpleNamespace(path="/api/bench")
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app({"type": "http", "method": "GET", "route": route}, receive, send)
+    return (time.perf_counter() - start) / iterations
+
+
+def time_listener(iterations):
+    listener = MongoCommandMetrics()
+    started = SimpleNamespace(command_name="find", command={"find": "targets"}, request_id=0)
+    succeeded = SimpleNamespace(command_name="find", request_id=0, duration_micros=250)
+    start = time.perf_counter()
+    for i in range(iterations):
+        started.request_id = succeeded.request_id = i
+        listener.started(started)
+        listener.succeeded(succeeded)
+    return (time.perf_counter() - start) / iterations
+
+
+async def run(args):
+    bare = await time_app(bare_app, args.iterations)
+    wrapped = await time_app(MetricsMiddleware(bare_app), args.iterations)
+    listener = time_listener(args.iterations)
+    print(f"request without middleware  {bare * 1e6:8.2f} us")
+    print(f"request with middleware     {wrapped * 1e6:8.2f} us")
+    print(f"middleware overhead         {(wrapped - bare) * 1e6:8.2f} us/request")
+    print(f"command listener overhead   {listener * 1e6:8.2f} us/command")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
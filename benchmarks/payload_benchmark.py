@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Response size benchmark for target lists.
+
+Seeds one case with --targets targets, then reads all of them through
+GET /api/cases/{id}/targets, page by page (format=json, limit 1000) and as
+one NDJSON stream, for each combination of:
+
+    fields      every target field, or only --fields (sparse fieldset)
+    encoding    identity, gzip, and br when the brotli package is installed
+
+Reports bytes on the wire, decoded bytes and time per full read. Prints a
+table to stderr and writes JSON results to --output, or stdout.
+
+    python benchmarks/payload_benchmark.py --mongo-url mongodb://localhost:27017
+    python benchmarks/payload_benchmark.py --mock --targets 10000
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from common import app_client, drop_database, seed_session, server, use_database
+import compression
+
+PAGE_SIZE = 1000
+
+
+def make_targets(case_id: str, count: int):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "case_id": case_id,
+            "url": f"https://host{i % 500}.example.com/files/{i}",
+            "url_canonical": f"https://host{i % 500}.example.com/files/{i}",
+            "domain": f"host{i % 500}.example.com",
+            "status": "pending",
+            "last_checked_at": None,
+            "last_status_code": None,
+            "next_check_at": now,
+            "removed_at": None,
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+async def read_all(client, url, params, headers, paged):
+    """Read every target, returning (wire bytes, decoded bytes, targets)"""
+    wire = decoded = targets = 0
+    cursor = None
+    while True:
+        page_params = {**params, "cursor": cursor} if cursor else params
+        response = await client.get(url, params=page_params, headers=headers)
+        response.raise_for_status()
+        wire += response.num_bytes_downloaded
+        decoded += len(response.content)
+        if not paged:
+            return wire, decoded, response.text.count("\n")
+        targets += len(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return wire, decoded, targets
+
+
+async def measure(client, url, params, headers, paged, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        wire, decoded, targets = await read_all(client, url, params, headers, paged)
+    return {
+        "targets": targets,
+        "wire_bytes": wire,
+        "decoded_bytes": decoded,
+        "ms_per_read": round((time.perf_counter() - start) / rounds * 1000, 1),
+    }
+
+
+async def run(args):
+    db = use_database(args.mock, args.mongo_url)
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli else [])
+    results = {}
+    try:
+        headers = await seed_session(db, "bench-payload-user")
+        case_id = "bench-payload-case"
+        await db.cases.insert_one({
+            "id": case_id, "client_id": "bench-payload-user", "title": "bench", "description": "bench", "version": 0
+        })
+        docs = make_targets(case_id, args.targets)
+        for i in range(0, len(docs), PAGE_SIZE):
+            await db.targets.insert_many(docs[i:i + PAGE_SIZE])
+
+        url = f"/api/cases/{case_id}/targets"
+        async with app_client() as client:
+            for format in ["json", "ndjson"]:
+                for fields in [None, args.fields]:
+                    for encoding in encodings:
+                        params = {"format": format, "limit": PAGE_SIZE}
+                        if fields:
+                            params["fields"] = fields
+                        r = await measure(
+                            client, url, params, {**headers, "Accept-Encoding": encoding},
+                            format == "json", args.rounds
+                        )
+                        name = f"{format}/{'sparse' if fields else 'full'}/{encoding}"
+                        results[name] = r
+                        print(
+                            f"{name:<22} {r['wire_bytes']:>12,} wire  {r['decoded_bytes']:>12,} decoded  "
+                            f"{r['ms_per_read']:>9.1f}ms per read",
+                            file=sys.stderr
+                        )
+    finally:
+        await drop_database(args.mock)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "mock": args.mock,
+            "targets": args.targets,
+            "fields": args.fields,
+            "rounds": args.rounds,
+            "compression_min_size": server.COMPRESSION_MIN_SIZE,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mock", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--mongo-url", help="MongoDB to benchmark against (default: MONGO_URL)")
+    parser.add_argument("--targets", type=int, default=10000, help="targets in the case")
+    parser.add_argument("--fields", default="url,domain,status", help="sparse fieldset to compare against")
+    parser.add_argument("--rounds", type=int, default=3, help="full reads per combination")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
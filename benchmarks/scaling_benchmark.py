@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Multi-process scaling benchmark.
+
+Starts `backend/serve.py` with each --workers count in turn, drives it over
+real HTTP from --load-processes load generator processes, and reports RPS,
+p50/p99 latency and the speedup over the first worker count. JSON results
+go to --output, or stdout.
+
+    python benchmarks/scaling_benchmark.py --workers 1 2 4 --duration 10
+    python benchmarks/scaling_benchmark.py --scenarios root --workers 1 2
+
+Scenarios: root (GET /api/, no database work), auth (GET /api/auth/me) and
+cases (GET /api/cases). auth and cases seed a throwaway "<DB_NAME>_bench"
+database on --mongo-url (default: MONGO_URL) and need MongoDB; root does not.
+The load generators share the host with the server, so on small machines
+give them fewer cores (--load-processes) than the server.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from common import bench_db_name, drop_database, percentile, seed_session, server, use_database
+
+SCENARIOS = {
+    "root": "/api/",
+    "auth": "/api/auth/me",
+    "cases": "/api/cases?limit=20",
+}
+SERVE = Path(__file__).resolve().parent.parent / "backend" / "serve.py"
+
+
+async def seed(mongo_url, cases):
+    """Seed one user with cases and return its auth headers"""
+    db = use_database(False, mongo_url)
+    headers = await seed_session(db, "bench-scaling-user")
+    now = datetime.now(timezone.utc)
+    await db.cases.insert_many([
+        {
+            "id": f"bench-scaling-case-{c}",
+            "client_id": "bench-scaling-user",
+            "title": f"Bench case {c}",
+            "description": "Seeded by scaling_benchmark",
+            "status": "submitted",
+            "priority": "normal",
+            "version": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for c in range(cases)
+    ])
+    return headers
+
+
+async def drop_seed(mongo_url):
+    use_database(False, mongo_url)
+    await drop_database(False)
+
+
+def start_server(workers, port, mongo_url):
+    env = {
+        **os.environ,
+        "DB_NAME": bench_db_name(),
+        # Measure serving capacity, not the per-client limits or background work
+        "RATE_LIMITS": "",
+        "QUOTA_MAX_CASES": "0",
+        "QUOTA_MAX_TARGETS": "0",
+        "JOBS_IN_APP": "0",
+        "CHECKER_ENABLED": "",
+    }
+    if mongo_url:
+        env["MONGO_URL"] = mongo_url
+    return subprocess.Popen(
+        [sys.executable, str(SERVE), "--workers", str(workers), "--port", str(port),
+         "--host", "127.0.0.1", "--log-level", "warning", "--no-access-log"],
+        env=env
+    )
+
+
+def wait_until_up(base_url, path, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + path, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    sys.exit(f"Server at {base_url} not up after {timeout}s ({path})")
+
+
+def load_process(url, headers, concurrency, duration):
+    """One load generator: `concurrency` keep-alive clients for `duration` seconds"""
+    async def run():
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(headers=headers, limits=limits, timeout=30) as client:
+            async def worker():
+                nonlocal errors
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(url)
+                        if response.status_code >= 400:
+                            errors += 1
+                    except httpx.HTTPError:
+                        errors += 1
+                    latencies.append(time.perf_counter() - start)
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, errors
+
+    return asyncio.run(run())
+
+
+def run_load(url, headers, args):
+    with multiprocessing.Pool(args.load_processes) as pool:
+        start = time.perf_counter()
+        results = pool.starmap(
+            load_process, [(url, headers, args.concurrency, args.duration)] * args.load_processes
+        )
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    return {
+        "requests": len(latencies),
+        "errors": sum(result[1] for result in results),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *(2 ** i for i in range(1, cpus.bit_length()) if 2 ** i <= cpus)})
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", help="MongoDB for the server and seeding (default: MONGO_URL)")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario and worker count")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients per load process")
+    parser.add_argument("--load-processes", type=int, default=max(1, cpus // 2))
+    parser.add_argument("--cases", type=int, default=50, help="cases seeded for the cases scenario")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    needs_db = any(scenario != "root" for scenario in args.scenarios)
+    headers = {}
+    if needs_db:
+        headers = asyncio.run(seed(args.mongo_url, args.cases))
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    try:
+        for workers in args.workers:
+            process = start_server(workers, args.port, args.mongo_url)
+            try:
+                wait_until_up(base_url, "/readyz" if needs_db else "/healthz")
+                for scenario in args.scenarios:
+                    r = run_load(base_url + SCENARIOS[scenario], headers, args)
+                    baseline = results.get(scenario, {}).get(args.workers[0], r)
+                    r["speedup"] = round(r["rps"] / baseline["rps"], 2) if baseline["rps"] else 0.0
+                    results.setdefault(scenario, {})[workers] = r
+                    print(
+                        f"{scenario:<6} workers {workers:>3}  {r['rps']:>9.1f} rps  x{r['speedup']:<5}  "
+                        f"p50 {r['p50_ms']:>8.2f}ms  p99 {r['p99_ms']:>8.2f}ms  errors {r['errors']}",
+                        file=sys.stderr
+                    )
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        if needs_db:
+            asyncio.run(drop_seed(args.mongo_url))
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "cpus": cpus,
+        "config": {
+            "workers": args.workers,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "load_processes": args.load_processes,
+            "mongo_max_pool_size": server.mongo_client_options()["maxPoolSize"],
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+List response serialization benchmark.
+
+Measures requests/sec for GET /api/cases/{id}/targets returning 1k and 10k
+targets under each RESPONSE_MODE (model, validated, trusted). Page fetching is
+replaced with pre-built documents so the numbers isolate validation and
+JSON encoding from database time.
+
+    python benchmarks/serialization_benchmark.py --seconds 5
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+from common import app_client, seed_session, server, use_database
+
+
+def make_targets(case_id: str, count: int):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "case_id": case_id,
+            "url": f"https://host{i % 500}.example.com/files/{i}",
+            "url_canonical": f"https://host{i % 500}.example.com/files/{i}",
+            "domain": f"host{i % 500}.example.com",
+            "status": "pending",
+            "last_checked_at": None,
+            "last_status_code": None,
+            "next_check_at": now,
+            "removed_at": None,
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+async def measure(client, url, headers, seconds):
+    requests = 0
+    size = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        size = len(response.content)
+        requests += 1
+    return requests / (time.perf_counter() - start), size
+
+
+async def run(args):
+    db = use_database(mock=True)
+    headers = await seed_session(db, "bench-user")
+    case_id = "bench-case"
+    await db.cases.insert_one({"id": case_id, "client_id": "bench-user", "title": "bench", "description": "bench"})
+
+    async with app_client() as client:
+        print(f"{'targets':>8} {'mode':<10} {'req/sec':>10} {'bytes':>12}")
+        for count in args.counts:
+            docs = make_targets(case_id, count)
+
+            async def fetch_page(collection, query, cursor, limit, descending=False, projection=None):
+                return docs, None
+
+            server.fetch_page = fetch_page
+            for mode in server.RESPONSE_MODES:
+                server.RESPONSE_MODE = mode
+                rps, size = await measure(client, f"/api/cases/{case_id}/targets", headers, args.seconds)
+                print(f"{count:>8} {mode:<10} {rps:>10.1f} {size:>12,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000], help="targets per response")
+    parser.add_argument("--seconds", type=float, default=5, help="duration of each measurement")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
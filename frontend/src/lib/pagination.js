@@ -0,0 +1,18 @@
+import axios from 'axios';
+
+// Largest page the list endpoints serve
+export const MAX_PAGE_SIZE = 1000;
+
+// GET every page of a list endpoint, following X-Next-Cursor
+export async function fetchAllPages(url, config = {}) {
+  const items = [];
+  let cursor = null;
+  do {
+    const params = { limit: MAX_PAGE_SIZE, ...config.params };
+    if (cursor) params.cursor = cursor;
+    const response = await axios.get(url, { ...config, params });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return items;
+}
@@ -6,8 +6,11 @@ import { Input } from '../components/ui/input';
 import { Shield, ArrowLeft, FileText, Clock, CheckCircle, AlertCircle, Plus, ExternalLink } from 'lucide-react';
 import { useToast } from '../hooks/use-toast';
 import axios from 'axios';
+import { fetchAllPages } from '../lib/pagination';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+// At most one refetch per this many ms, however many events arrive
+const REFETCH_DELAY_MS = 1000;
 
 const CaseDetails = () => {
   const { id } = useParams();
@@ -23,16 +26,38 @@ const CaseDetails = () => {
     fetchCaseDetails();
   }, [id]);
 
+  // Refetch when the server pushes a status change instead of polling; a
+  // burst of events (bulk status updates) collapses into one refetch
+  useEffect(() => {
+    let refetchTimer = null;
+    const scheduleRefetch = () => {
+      if (refetchTimer) return;
+      refetchTimer = setTimeout(() => {
+        refetchTimer = null;
+        fetchCaseDetails();
+      }, REFETCH_DELAY_MS);
+    };
+
+    const events = new EventSource(`${BACKEND_URL}/api/cases/${id}/events`, { withCredentials: true });
+    ['case', 'target', 'targets', 'resync'].forEach((type) =>
+      events.addEventListener(type, scheduleRefetch)
+    );
+    return () => {
+      clearTimeout(refetchTimer);
+      events.close();
+    };
+  }, [id]);
+
   const fetchCaseDetails = async () => {
     try {
-      const [caseResponse, targetsResponse] = await Promise.all([
+      const [caseResponse, allTargets] = await Promise.all([
         axios.get(`${BACKEND_URL}/api/cases/${id}`, {
           withCredentials: true,
           headers: {
             Authorization: `Bearer ${document.cookie.split('session_token=')[1]?.split(';')[0]}`
           }
         }),
-        axios.get(`${BACKEND_URL}/api/cases/${id}/targets`, {
+        fetchAllPages(`${BACKEND_URL}/api/cases/${id}/targets`, {
           withCredentials: true,
           headers: {
             Authorization: `Bearer ${document.cookie.split('session_token=')[1]?.split(';')[0]}`
@@ -40,7 +65,7 @@ const CaseDetails = () => {
         })
       ]);
       setCase(caseResponse.data);
-      setTargets(targetsResponse.data);
+      setTargets(allTargets);
     } catch (error) {
       console.error('Failed to fetch case:', error);
       toast({
@@ -3,7 +3,7 @@ import { Link } from 'react-router-dom';
 import { useAuth } from '../contexts/AuthContext';
 import { Button } from '../components/ui/button';
 import { Shield, Plus, FileText, Clock, CheckCircle, AlertCircle, LogOut, User } from 'lucide-react';
-import axios from 'axios';
+import { fetchAllPages } from '../lib/pagination';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
@@ -19,19 +19,19 @@ const Dashboard = () => {
 
   const fetchCases = async () => {
     try {
-      const response = await axios.get(`${BACKEND_URL}/api/cases`, {
+      const allCases = await fetchAllPages(`${BACKEND_URL}/api/dashboard/cases`, {
         withCredentials: true,
         headers: {
           Authorization: `Bearer ${document.cookie.split('session_token=')[1]?.split(';')[0]}`
         }
       });
-      setCases(response.data);
+      setCases(allCases);
       
       // Calculate stats
-      const total = response.data.length;
-      const filed = response.data.filter(c => c.status === 'filed' || c.status === 'in_review').length;
-      const removed = response.data.filter(c => c.status === 'removed').length;
-      const pending = response.data.filter(c => c.status === 'submitted').length;
+      const total = allCases.length;
+      const filed = allCases.filter(c => c.status === 'filed' || c.status === 'in_review').length;
+      const removed = allCases.filter(c => c.status === 'removed').length;
+      const pending = allCases.filter(c => c.status === 'submitted').length;
       setStats({ total, filed, removed, pending });
     } catch (error) {
       console.error('Failed to fetch cases:', error);
@@ -186,6 +186,8 @@ const Dashboard = () => {
                         <span>Created {new Date(case_.created_at).toLocaleDateString()}</span>
                         <span>•</span>
                         <span>Priority: {case_.priority || 'Normal'}</span>
+                        <span>•</span>
+                        <span>{case_.target_total} URLs</span>
                       </div>
                     </div>
                     <div>
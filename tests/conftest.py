@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The backend is a flat directory of modules, imported the way server.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
@@ -0,0 +1,77 @@
+"""Signed session cookies through the auth routes, on mongomock"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+import server
+from session_tokens import RevocationList, SessionSigner
+
+LOGIN = {"id": "user-1", "email": "ann@example.com", "name": "Ann", "session_token": "upstream-token"}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    server.use_db(mongomock_motor.AsyncMongoMockClient().auth_test)
+    monkeypatch.setattr(server, "session_signer", SessionSigner([b"key"]))
+    monkeypatch.setattr(server, "revocations", RevocationList(server.db.user_sessions))
+    return server.app
+
+
+async def login(client) -> str:
+    response = await client.post("/api/auth/session", json=LOGIN)
+    assert response.status_code == 200
+    return response.cookies["session_token"]
+
+
+async def me(client, cookie: str) -> httpx.Response:
+    return await client.get("/api/auth/me", headers={"Cookie": f"session_token={cookie}"})
+
+
+def run(app, scenario):
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await scenario(client)
+    asyncio.run(main())
+
+
+def test_me_renews_a_live_signed_session(app):
+    async def scenario(client):
+        cookie = await login(client)
+        response = await me(client, cookie)
+        assert response.status_code == 200
+        renewed = response.cookies["session_token"]
+        assert (await me(client, renewed)).status_code == 200
+    run(app, scenario)
+
+
+def test_me_refuses_to_renew_a_revocation_not_yet_polled(app):
+    async def scenario(client):
+        cookie = await login(client)
+        # Another worker logs the session out; this one has not polled yet
+        await server.db.user_sessions.update_one(
+            {"user_id": LOGIN["id"]}, {"$set": {"revoked_at": datetime.now(timezone.utc)}}
+        )
+        response = await me(client, cookie)
+        assert response.status_code == 401
+        assert "session_token" not in response.cookies
+        # The refusal also revokes the token in this process straight away
+        assert (await me(client, cookie)).status_code == 401
+        await server.revocations.refresh()
+        assert (await me(client, cookie)).status_code == 401
+    run(app, scenario)
+
+
+def test_login_after_logout_gets_a_working_token(app):
+    async def scenario(client):
+        cookie = await login(client)
+        await client.post("/api/auth/logout", headers={"Cookie": f"session_token={cookie}"})
+        assert (await me(client, cookie)).status_code == 401
+        await asyncio.sleep(0.01)
+        assert (await me(client, await login(client))).status_code == 200
+    run(app, scenario)
@@ -0,0 +1,74 @@
+"""canonicalize_url and the target domains derived from URLs and parameters"""
+
+import pytest
+
+from server import canonicalize_url, normalize_domain, target_domain
+
+
+@pytest.mark.parametrize("url, canonical", [
+    # Scheme and host case, default ports
+    ("HTTPS://Example.COM/Path", "https://example.com/Path"),
+    ("https://example.com:443/a", "https://example.com/a"),
+    ("http://example.com:80", "http://example.com/"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("https://example.com:80/a", "https://example.com:80/a"),
+    ("http://[::1]:80/a", "http://[::1]/a"),
+    # Query: tracking parameters dropped, the rest sorted, blanks kept
+    ("https://example.com/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/a?utm_source=x&UTM_Medium=y&id=3", "https://example.com/a?id=3"),
+    ("https://example.com/a?fbclid=1&gclid=2", "https://example.com/a"),
+    ("https://example.com/a?b=&a=1", "https://example.com/a?a=1&b="),
+    # Fragments name resources on some hosts; only text directives go
+    ("https://mega.nz/file/abc#!id!key", "https://mega.nz/file/abc#!id!key"),
+    ("https://example.com/#/video/12", "https://example.com/#/video/12"),
+    ("https://example.com/p#:~:text=hello", "https://example.com/p"),
+    ("https://example.com/p#section:~:text=hello", "https://example.com/p#section"),
+    # Userinfo keeps its case; surrounding whitespace goes
+    ("https://User:Pw@Example.com/", "https://User:Pw@example.com/"),
+    ("  https://example.com/a  ", "https://example.com/a"),
+])
+def test_canonicalize_url(url, canonical):
+    assert canonicalize_url(url) == canonical
+
+
+def test_equivalent_spellings_share_a_canonical_form():
+    spellings = [
+        "https://example.com/a?x=1&y=2",
+        "HTTPS://EXAMPLE.com:443/a?y=2&x=1&utm_campaign=z",
+        " https://example.com/a?x=1&fbclid=abc&y=2 ",
+    ]
+    assert len({canonicalize_url(url) for url in spellings}) == 1
+
+
+def test_distinct_fragments_stay_distinct():
+    assert canonicalize_url("https://mega.nz/#!a!k1") != canonicalize_url("https://mega.nz/#!b!k2")
+
+
+def test_unparseable_url_is_returned_stripped():
+    assert canonicalize_url(" http://example.com:99999/a ") == "http://example.com:99999/a"
+
+
+@pytest.mark.parametrize("url, domain", [
+    ("HTTPS://Example.COM:443/a", "example.com"),
+    ("https://user:pw@example.com/", "example.com"),
+    ("http://example.com:8080/", "example.com:8080"),
+    ("http://example.com:99999/", "unknown"),
+    ("not a url", "unknown"),
+])
+def test_target_domain(url, domain):
+    assert target_domain(url) == domain
+
+
+@pytest.mark.parametrize("given, domain", [
+    ("Example.COM", "example.com"),
+    (" example.com:443 ", "example.com"),
+    ("example.com:80", "example.com"),
+    ("example.com:8080", "example.com:8080"),
+    ("https://Example.com:443/a", "example.com"),
+    ("http://example.com:443/", "example.com:443"),
+    ("user@example.com", "example.com"),
+    ("[::1]:443", "[::1]"),
+    ("unknown", "unknown"),
+])
+def test_normalize_domain_matches_stored_domains(given, domain):
+    assert normalize_domain(given) == domain
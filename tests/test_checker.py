@@ -0,0 +1,160 @@
+"""TargetChecker.fetch_status against a local stub HTTP server"""
+
+import asyncio
+import socket
+import threading
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from checker import PublicAddressTransport, TargetChecker, is_public_address
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _respond(self, head: bool):
+        if self.path == "/live":
+            status, headers = 200, {}
+        elif self.path == "/gone":
+            status, headers = 404, {}
+        elif self.path == "/moved":
+            status, headers = 302, {"Location": "/gone"}
+        elif self.path == "/no-head":
+            status, headers = (405 if head else 410), {}
+        else:
+            status, headers = 500, {}
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._respond(head=True)
+
+    def do_GET(self):
+        self._respond(head=False)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def fetch(url: str, **kwargs):
+    async def run():
+        checker = TargetChecker(SimpleNamespace(domain_stats=None), timeout=5, **kwargs)
+        try:
+            return await checker.fetch_status(url)
+        finally:
+            await checker.close()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("path, status", [
+    ("/live", 200),
+    ("/gone", 404),
+    ("/moved", 404),    # redirects are followed
+    ("/no-head", 410),  # HEAD rejected, retried with GET
+])
+def test_fetch_status(stub_url, path, status):
+    assert fetch(stub_url + path, allow_private_addresses=True) == status
+
+
+def test_private_addresses_are_refused(stub_url):
+    assert fetch(stub_url + "/live") is None
+    assert fetch("http://169.254.169.254/latest/meta-data/") is None
+
+
+@pytest.mark.parametrize("address, public", [
+    ("93.184.216.34", True),
+    ("2606:2800:220:1::1", True),
+    ("127.0.0.1", False),
+    ("10.1.2.3", False),
+    ("172.16.0.1", False),
+    ("192.168.1.1", False),
+    ("169.254.169.254", False),
+    ("100.64.0.1", False),
+    ("0.0.0.0", False),
+    ("::1", False),
+    ("fe80::1%eth0", False),
+    ("fc00::1", False),
+    ("::ffff:127.0.0.1", False),
+    ("224.0.0.1", False),
+])
+def test_is_public_address(address, public):
+    assert is_public_address(address) is public
+
+
+def test_redirects_are_checked_and_pinned():
+    addresses = {"files.example": "93.184.216.34", "internal.example": "10.0.0.5"}
+    seen = []
+
+    async def getaddrinfo(host, port, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (addresses[host], port))]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(302, headers={"Location": "http://internal.example/admin"})
+
+    async def run():
+        asyncio.get_running_loop().getaddrinfo = getaddrinfo
+        transport = PublicAddressTransport(httpx.MockTransport(handler))
+        async with httpx.AsyncClient(transport=transport, follow_redirects=True) as client:
+            with pytest.raises(httpx.ConnectError):
+                await client.get("https://files.example:8443/file")
+
+    asyncio.run(run())
+    # The first hop went to the address that was checked, keeping its Host
+    # and TLS name; the redirect to a private address never left
+    assert len(seen) == 1
+    assert seen[0].url.host == "93.184.216.34"
+    assert seen[0].headers["Host"] == "files.example:8443"
+    assert seen[0].extensions["sni_hostname"] == "files.example"
+
+
+def test_check_case_leases_in_batches_and_skips_leased_targets(stub_url):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient().checker_test
+    now = datetime.now(timezone.utc)
+    targets = [
+        {"id": f"t{i}", "case_id": "c1", "url": f"{stub_url}/{'gone' if i % 5 == 0 else 'live'}",
+         "domain": "127.0.0.1", "status": "pending", "next_check_at": now + timedelta(days=1)}
+        for i in range(25)
+    ]
+    # Being checked by the background loop right now
+    targets.append({**targets[1], "id": "busy", "lease_owner": "other", "next_check_at": now + timedelta(minutes=5)})
+    fetched, progress = [], []
+
+    async def run():
+        await db.targets.insert_many(targets)
+        checker = TargetChecker(db, timeout=5, batch_size=10, allow_private_addresses=True)
+        fetch_status = checker.fetch_status
+
+        async def counting_fetch(url):
+            fetched.append(url)
+            return await fetch_status(url)
+
+        checker.fetch_status = counting_fetch
+        try:
+            async def record(done, total):
+                progress.append((done, total))
+            return await checker.check_case({"id": "c1", "priority": "normal", "client_id": "u1"}, record)
+        finally:
+            await checker.close()
+
+    result = asyncio.run(run())
+    assert result == {"checked": 25, "removed": 5}
+    assert len(fetched) == 25
+    assert progress == [(10, 26), (20, 26), (25, 26)]
+    busy = asyncio.run(db.targets.find_one({"id": "busy"}))
+    assert busy["lease_owner"] == "other" and "last_checked_at" not in busy
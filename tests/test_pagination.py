@@ -0,0 +1,106 @@
+"""Keyset cursors, filters and the merge of live and archived pages"""
+
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from server import decode_cursor, encode_cursor, keyset_filter, merge_pages
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def doc(doc_id: str, minutes=None) -> dict:
+    created_at = None if minutes is None else T0 + timedelta(minutes=minutes)
+    return {"id": doc_id, "created_at": created_at}
+
+
+# Ties on created_at, and documents written before created_at existed
+DOCS = [
+    doc("a", 0), doc("b", 0), doc("c", 1), doc("d", 2), doc("e", 2), doc("f", 2), doc("g", 3),
+    doc("n1"), doc("n2"), {"id": "n3"},
+]
+
+
+@pytest.fixture
+def collection():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().pagination_test.docs
+    collection.insert_many([dict(d) for d in DOCS])
+    return collection
+
+
+def read_all(collection, limit: int, descending: bool) -> list:
+    """Page through collection the way fetch_page does, returning ids in order"""
+    direction = -1 if descending else 1
+    ids, cursor = [], None
+    while True:
+        query = keyset_filter(cursor, descending) if cursor else {}
+        docs = list(collection.find(query, {"_id": 0}).sort(
+            [("created_at", direction), ("id", direction)]
+        ).limit(limit + 1))
+        ids += [d["id"] for d in docs[:limit]]
+        if len(docs) <= limit:
+            return ids
+        cursor = encode_cursor(docs[limit - 1])
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 20])
+def test_pages_cover_every_document_once_in_order(collection, limit, descending):
+    direction = -1 if descending else 1
+    expected = [d["id"] for d in collection.find({}, {"_id": 0}).sort(
+        [("created_at", direction), ("id", direction)]
+    )]
+    assert read_all(collection, limit, descending) == expected
+
+
+def test_null_created_at_sorts_first_ascending_and_last_descending(collection):
+    assert read_all(collection, 2, descending=False)[:3] == ["n1", "n2", "n3"]
+    assert read_all(collection, 2, descending=True)[-3:] == ["n3", "n2", "n1"]
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(doc("x", 5))) == (T0 + timedelta(minutes=5), "x")
+    assert decode_cursor(encode_cursor({"id": "y"})) == (None, "y")
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bnVsbA==", "WzFd"])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as raised:
+        keyset_filter(cursor, descending=False)
+    assert raised.value.status_code == 400
+
+
+def test_merge_keeps_the_first_copy_of_a_document_in_both_tiers():
+    live = [{**doc("b", 1), "tier": "live"}, doc("a", 3)]
+    archived = [{**doc("b", 1), "tier": "archive"}, doc("c", 2)]
+    docs, next_cursor = merge_pages([live, archived], limit=5, descending=True)
+    assert [d["id"] for d in docs] == ["a", "c", "b"]
+    assert docs[2]["tier"] == "live"
+    assert next_cursor is None
+
+
+@pytest.mark.parametrize("descending, expected", [
+    (False, ["n", "a", "b", "c"]),
+    (True, ["c", "b", "a", "n"]),
+])
+def test_merge_orders_like_mongodb(descending, expected):
+    live = [doc("b", 1), doc("n")]
+    archived = [doc("c", 2), doc("a", 1)]
+    docs, _ = merge_pages([live, archived], limit=10, descending=descending)
+    assert [d["id"] for d in docs] == expected
+
+
+def test_merge_cuts_to_limit_with_a_cursor_after_the_last_kept():
+    live = [doc("a", 1), doc("b", 2), doc("c", 3)]
+    archived = [doc("d", 4)]
+    docs, next_cursor = merge_pages([live, archived], limit=2, descending=False)
+    assert [d["id"] for d in docs] == ["a", "b"]
+    assert decode_cursor(next_cursor) == (T0 + timedelta(minutes=2), "b")
+
+
+def test_merge_at_exactly_limit_has_a_cursor_only_when_told_there_is_more():
+    pages = [[doc("a", 1)], [doc("b", 2)]]
+    assert merge_pages(pages, limit=2, descending=False)[1] is None
+    assert merge_pages(pages, limit=2, descending=False, more=True)[1] is not None
@@ -0,0 +1,83 @@
+"""Token-bucket behaviour of the rate limit backends"""
+
+import asyncio
+
+import pytest
+
+from ratelimit import Limit, LocalBackend, MongoBackend, RateLimiter, parse_limits
+
+LIMIT = Limit(requests=3, seconds=30)  # a token every 10s, bursts of 3
+
+
+def local_backend():
+    return LocalBackend()
+
+
+def mongo_backend():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return MongoBackend(mongomock_motor.AsyncMongoMockClient().ratelimit_test.rate_limits)
+
+
+@pytest.fixture(params=[local_backend, mongo_backend], ids=["local", "mongo"])
+def backend(request):
+    return request.param()
+
+
+def acquire(backend, key: str, now: float, limit: Limit = LIMIT):
+    return asyncio.run(backend.acquire(key, limit, now))
+
+
+def test_burst_then_wait_for_the_next_token(backend):
+    assert [acquire(backend, "k", 1000.0) for _ in range(3)] == [None, None, None]
+    assert acquire(backend, "k", 1000.0) == pytest.approx(10.0)
+    # 6s until the next token; MongoBackend rounds a refusal up to one interval
+    assert 6.0 - 1e-6 <= acquire(backend, "k", 1004.0) <= LIMIT.interval
+
+
+def test_tokens_refill_at_the_limit_rate(backend):
+    for _ in range(3):
+        acquire(backend, "k", 1000.0)
+    assert acquire(backend, "k", 1010.0) is None
+    assert acquire(backend, "k", 1010.0) is not None
+    # A full refill period restores the whole burst, and no more
+    assert [acquire(backend, "k", 1050.0) for _ in range(4)][:3] == [None, None, None]
+    assert acquire(backend, "k", 1050.0) is not None
+
+
+def test_refused_requests_take_no_token(backend):
+    for _ in range(3):
+        acquire(backend, "k", 1000.0)
+    for _ in range(5):
+        assert acquire(backend, "k", 1001.0) is not None
+    assert acquire(backend, "k", 1010.0) is None
+
+
+def test_keys_are_independent(backend):
+    for _ in range(3):
+        acquire(backend, "a", 1000.0)
+    assert acquire(backend, "a", 1000.0) is not None
+    assert acquire(backend, "b", 1000.0) is None
+
+
+def test_local_backend_forgets_least_recently_used_keys():
+    backend = LocalBackend(maxsize=2)
+    for _ in range(3):
+        acquire(backend, "a", 1000.0)
+    acquire(backend, "b", 1000.0)
+    acquire(backend, "c", 1000.0)
+    # "a" was evicted, so it starts again with a full bucket
+    assert acquire(backend, "a", 1000.0) is None
+
+
+def test_rate_limiter_keys_buckets_by_route_class_and_client():
+    limiter = RateLimiter({"targets": Limit(1, 60)}, LocalBackend())
+    assert asyncio.run(limiter.hit("targets", "alice")) is None
+    assert asyncio.run(limiter.hit("targets", "alice")) is not None
+    assert asyncio.run(limiter.hit("targets", "bob")) is None
+    assert asyncio.run(limiter.hit("unlimited", "alice")) is None
+
+
+def test_parse_limits():
+    assert parse_limits("auth=30/60, targets = 5/1,") == {"auth": Limit(30, 60.0), "targets": Limit(5, 1.0)}
+    assert parse_limits("") == {}
+    assert Limit(30, 60).interval == 2.0
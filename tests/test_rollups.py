@@ -0,0 +1,103 @@
+"""Removal histogram buckets, medians and rollup deltas"""
+
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from rollups import REMOVAL_BUCKET_HOURS, DomainRollups, RollupDelta, median_hours, removal_bucket
+
+REMOVED_AT = datetime(2024, 1, 10, tzinfo=timezone.utc)
+
+
+def removed_after(hours: float, aware: bool = True) -> int:
+    created_at = REMOVED_AT - timedelta(hours=hours)
+    return removal_bucket(created_at if aware else created_at.replace(tzinfo=None), REMOVED_AT)
+
+
+@pytest.mark.parametrize("hours, bucket", [
+    (0, 0),
+    (0.5, 0),
+    (1, 0),      # bounds are inclusive
+    (1.01, 1),
+    (24, 5),
+    (1440, len(REMOVAL_BUCKET_HOURS) - 1),
+    (1441, len(REMOVAL_BUCKET_HOURS)),
+    (10000, len(REMOVAL_BUCKET_HOURS)),
+])
+def test_removal_bucket(hours, bucket):
+    assert removed_after(hours) == bucket
+
+
+def test_removal_bucket_treats_naive_times_as_utc_and_skips_unknown_creation():
+    assert removed_after(3, aware=False) == removed_after(3)
+    assert removal_bucket(None, REMOVED_AT) is None
+
+
+@pytest.mark.parametrize("histogram, median", [
+    ({}, None),
+    ({"0": 0}, None),
+    ({"0": 2}, 0.5),             # halfway through 0-1h
+    ({"1": 4}, 1.5),             # halfway through 1-2h
+    ({"0": 1, "2": 1}, 1.0),     # the first half ends with bucket 0
+    ({"0": 1, "1": 1, "2": 2}, 2.0),
+    ({"3": 1, "4": 3}, 9.3),     # a third of the way into 8-12h
+    ({"13": 3}, 1440.0),         # the open-ended bucket reports its lower bound
+    ({"0": 1, "13": 5}, 1440.0),
+])
+def test_median_hours(histogram, median):
+    assert median_hours(histogram) == median
+
+
+def test_delta_counts_inserts_and_transitions():
+    delta = RollupDelta()
+    assert not delta
+    delta.insert("a.com")
+    delta.insert("a.com", "filed")
+    delta.transition("a.com", "pending", "pending")
+    assert dict(delta.incs["a.com"]) == {"counts.pending": 1, "counts.filed": 1, "total": 2}
+
+    delta.transition("a.com", "filed", "removed", REMOVED_AT - timedelta(hours=3), REMOVED_AT)
+    assert dict(delta.incs["a.com"]) == {
+        "counts.pending": 1, "counts.filed": 0, "counts.removed": 1, "total": 2, "removal_hours.2": 1,
+    }
+    assert delta.last_removed_at["a.com"] == REMOVED_AT
+
+
+def test_delta_keeps_the_latest_removal_time():
+    delta = RollupDelta()
+    delta.removal("a.com", None, REMOVED_AT)
+    delta.removal("a.com", None, REMOVED_AT - timedelta(days=1))
+    assert delta.last_removed_at["a.com"] == REMOVED_AT
+    # Without a creation time there is no histogram entry
+    assert not any(key.startswith("removal_hours") for key in delta.incs["a.com"])
+
+
+def test_operations_upsert_one_row_per_domain():
+    delta = RollupDelta()
+    delta.insert("a.com")
+    delta.insert("b.com")
+    delta.removal("b.com", None, REMOVED_AT)
+    operations = {op._filter["domain"]: op for op in delta.operations("client-1", REMOVED_AT)}
+    assert set(operations) == {"a.com", "b.com"}
+    assert operations["a.com"]._filter == {"client_id": "client-1", "domain": "a.com"}
+    assert operations["a.com"]._upsert
+    assert "$max" not in operations["a.com"]._doc
+    assert operations["b.com"]._doc["$max"] == {"last_removed_at": REMOVED_AT}
+
+
+def test_apply_without_a_client_only_touches_the_all_clients_rows():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    rollups = DomainRollups(mongomock_motor.AsyncMongoMockClient().rollups_test.domain_stats)
+
+    async def run():
+        for client_id in (None, "client-1"):
+            delta = RollupDelta()
+            delta.insert("a.com")
+            await rollups.apply(client_id, delta)
+        return await rollups.collection.find({}, {"_id": 0, "client_id": 1, "total": 1}).to_list(None)
+
+    rows = asyncio.run(run())
+    assert sorted(rows, key=lambda row: str(row["client_id"])) == [
+        {"client_id": None, "total": 2}, {"client_id": "client-1", "total": 1},
+    ]
@@ -0,0 +1,89 @@
+"""SessionSigner verification and RevocationList issue-time checks"""
+
+import time
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from session_tokens import RevocationList, SessionSigner, signer_from_env
+
+CLAIMS = {"sid": "c2lk", "uid": "user-1", "name": "Ann", "email": "ann@example.com", "picture": None}
+
+
+def expiring_in(seconds: float) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+
+def test_round_trip_carries_claims_and_issue_time():
+    signer = SessionSigner([b"key"])
+    before = time.time()
+    claims = signer.verify(signer.issue(CLAIMS, expiring_in(60)))
+    assert {name: claims[name] for name in CLAIMS} == CLAIMS
+    assert before - 1 <= claims["iat"] <= time.time() + 1
+
+
+def test_expired_token_is_rejected():
+    signer = SessionSigner([b"key"])
+    token = signer.issue(CLAIMS, expiring_in(60))
+    assert signer.verify(token, now=time.time() + 30) is not None
+    assert signer.verify(token, now=time.time() + 61) is None
+    assert signer.verify(signer.issue(CLAIMS, expiring_in(-1))) is None
+
+
+def test_rotation_verifies_with_every_key_and_signs_with_the_first():
+    old = SessionSigner([b"old"])
+    rotated = SessionSigner([b"new", b"old"])
+    old_token = old.issue(CLAIMS, expiring_in(60))
+    new_token = rotated.issue(CLAIMS, expiring_in(60))
+
+    assert rotated.verify(old_token) is not None
+    assert rotated.verify(new_token) is not None
+    assert old.verify(new_token) is None
+    # Dropping the old key retires the tokens it signed
+    assert SessionSigner([b"new"]).verify(old_token) is None
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda token: token[:-2] + ("AA" if token[-2:] != "AA" else "BB"),
+    lambda token: token.replace(token.split(".")[1], token.split(".")[1][::-1]),
+    lambda token: "v1." + token[len("v2."):],
+    lambda token: token.rpartition(".")[0],
+    lambda token: token + "!",
+    lambda token: "",
+])
+def test_tampered_token_is_rejected(tamper):
+    signer = SessionSigner([b"key"])
+    assert signer.verify(tamper(signer.issue(CLAIMS, expiring_in(60)))) is None
+
+
+def test_forged_claims_are_rejected():
+    signer = SessionSigner([b"key"])
+    forger = SessionSigner([b"guess"])
+    assert signer.verify(forger.issue({**CLAIMS, "uid": "admin"}, expiring_in(60))) is None
+
+
+def test_signer_from_env():
+    assert signer_from_env("") is None
+    assert signer_from_env(" , ") is None
+    assert signer_from_env("new, old").keys == [b"new", b"old"]
+
+
+def test_revocation_rejects_tokens_issued_before_it():
+    revocations = RevocationList(None)
+    revoked_at = datetime.now(timezone.utc)
+    revocations.add("sid", revoked_at, expiring_in(60))
+
+    assert revocations.is_revoked("sid", revoked_at.timestamp() - 1)
+    assert revocations.is_revoked("sid", revoked_at.timestamp())
+    # Logging in again after the revocation issues a token that works
+    assert not revocations.is_revoked("sid", revoked_at.timestamp() + 1)
+    assert not revocations.is_revoked("other", revoked_at.timestamp() - 1)
+
+
+def test_revocation_never_moves_back():
+    revocations = RevocationList(None)
+    later = datetime.now(timezone.utc)
+    revocations.add("sid", later, expiring_in(60))
+    revocations.add("sid", later - timedelta(seconds=10), expiring_in(60))
+    assert revocations.is_revoked("sid", later.timestamp() - 5)
+    assert len(revocations) == 1